@@ -1,4 +1,6 @@
-import random
+import random, sys, math, itertools, functools, os, statistics, csv
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 
 p1_games = 0
 p1_sets = 0
@@ -7,15 +9,15 @@ p2_sets = 0
    
 
 
-def play_game():
+def play_game(p: float = 0.55):
     p1 = 0
     p2 = 0
     global p1_games
     global p2_games
 
     while True:
-        # player 1 wins 55% of poins
-        if random.random() <= 0.55:
+        # player 1 wins a share p of points (55% by default)
+        if random.random() <= p:
             p1 += 1
         else:
             p2 += 1
@@ -27,14 +29,14 @@ def play_game():
             p2_games += 1
             return 2
     
-def play_set():
+def play_set(p: float = 0.55):
     p1 = 0
     p2 = 0
     global p1_sets
     global p2_sets
 
     while True:
-        if play_game() == 1:
+        if play_game(p) == 1:
             p1 += 1
         else:
             p2 += 1
@@ -46,12 +48,12 @@ def play_set():
             p2_sets += 1
             return 2
         
-def play_match():
+def play_match(p: float = 0.55):
     p1 = 0
     p2 = 0
 
     while True:
-        if play_set() == 1:
+        if play_set(p) == 1:
             p1 += 1
         else:
             p2 += 1
@@ -61,21 +63,360 @@ def play_match():
         if p2 == 2:
             return 2
         
-def play_games(n_matches: int):
+# plays n_matches from a clean slate and returns the counts, leaving the globals reset
+def count_matches(n_matches: int, p: float = 0.55) -> dict:
     p1 = 0
     p2 = 0
     global p1_games
     global p1_sets
     global p2_games
     global p2_sets
+    p1_games, p1_sets, p2_games, p2_sets = 0, 0, 0, 0
 
     for i in range(n_matches):
-        if play_match() == 1:
+        if play_match(p) == 1:
             p1 += 1
         else:
             p2 += 1
-    print(f"p1 games:   {100 * p1_games / (p1_games + p2_games):.2f}%")
-    print(f"p1 sets:    {100 * p1_sets / (p1_sets + p2_sets):.2f}%")
-    print(f"p1 matches: {100 * p1 / n_matches:.2f}% ({p1}/{n_matches} matches)")
+    return dict(zip(COUNT_KEYS, [p1_games, p2_games, p1_sets, p2_sets, p1, p2]))
 
-play_games(10000)
\ No newline at end of file
+def play_games(n_matches: int, p: float = 0.55):
+    print_results(count_matches(n_matches, p), p)
+
+COUNT_KEYS = ["p1_games", "p2_games", "p1_sets", "p2_sets", "p1_matches", "p2_matches"]
+
+# prints simulated win rates, alongside the exact values when p is given
+def print_results(counts: dict, p: float = None):
+    n_matches = counts["p1_matches"] + counts["p2_matches"]
+    exact = exact_probabilities(p) if p is not None else None
+    games = f"p1 games:   {100 * counts['p1_games'] / (counts['p1_games'] + counts['p2_games']):.2f}%"
+    sets = f"p1 sets:    {100 * counts['p1_sets'] / (counts['p1_sets'] + counts['p2_sets']):.2f}%"
+    matches = f"p1 matches: {100 * counts['p1_matches'] / n_matches:.2f}%"
+
+    if exact:
+        games += f" (exact {100 * exact['game']:.2f}%)"
+        sets += f" (exact {100 * exact['set']:.2f}%)"
+        matches += f" (exact {100 * exact['match']:.2f}%)"
+    print(games)
+    print(sets)
+    print(f"{matches} ({counts['p1_matches']}/{n_matches} matches)")
+
+
+################
+# Exact solver #
+################
+
+# The scoring rules form a Markov chain, so the chance of player 1 winning a game,
+# set or match follows exactly from p. Each level is memoized per p, so a sweep
+# only solves every probability once.
+
+# chance of winning a race to `target` points that must be won by two
+# it is always decided or tied at (target-1)-all after its first 2*target-2 points:
+# target+ points wins it, target-2 or fewer loses it, whatever order they came in
+def race_probability(p: float, target: int) -> float:
+    q = 1 - p
+    block = 2 * target - 2
+    win_block = sum(math.comb(block, k) * p**k * q**(block - k) for k in range(target, block + 1))
+    tied_block = math.comb(block, target - 1) * p**(target - 1) * q**(target - 1)
+    # from the tie, points come in pairs until one player wins both points of a pair
+    win_tied = p * p / (p * p + q * q)
+
+    return win_block + tied_block * win_tied
+
+@functools.lru_cache(maxsize=None)
+def game_probability(p: float) -> float:
+    return race_probability(p, 4)
+
+# tiebreak played at 6-6: first to 7 points, win by two
+@functools.lru_cache(maxsize=None)
+def tiebreak_probability(p: float) -> float:
+    return race_probability(p, 7)
+
+@functools.lru_cache(maxsize=None)
+def set_probability(p: float, tiebreak: bool = False) -> float:
+    g = game_probability(p)
+    t = tiebreak_probability(p) if tiebreak else g
+    # walk the chance of reaching each games score, one game at a time, with
+    # the same stopping rules as play_set; a set lasts at most 13 games
+    reach = {(0, 0): 1.0}
+    won = 0.0
+
+    for _ in range(13):
+        next_reach = {}
+        for (p1, p2), chance in reach.items():
+            game = t if p1 == 6 and p2 == 6 else g
+            for score, step in (((p1 + 1, p2), game), ((p1, p2 + 1), 1 - game)):
+                a, b = score
+                if a == 6 and b < 5 or a == 7:
+                    won += chance * step
+                elif not (b == 6 and a < 5 or b == 7):
+                    next_reach[score] = next_reach.get(score, 0.0) + chance * step
+        reach = next_reach
+
+    return won
+
+@functools.lru_cache(maxsize=None)
+def match_probability(p: float, best_of: int = 3, tiebreak: bool = False) -> float:
+    s = set_probability(p, tiebreak)
+    # win the deciding set after losing k of the others, for every k the format allows
+    n = best_of // 2 + 1
+    return sum(math.comb(n - 1 + k, k) * s**n * (1 - s)**k for k in range(n))
+
+def exact_probabilities(p: float, best_of: int = 3, tiebreak: bool = False) -> dict:
+    return {
+        "game": game_probability(p),
+        "set": set_probability(p, tiebreak),
+        "match": match_probability(p, best_of, tiebreak),
+    }
+
+
+################
+# NumPy engine #
+################
+
+# Same rules as play_game/play_set/play_match, but every match in a batch is
+# advanced one game per step, so the Python loop runs at most 39 times per
+# batch (the longest best-of-three match) instead of once per point
+
+# while in play, a match is fully described by the sets won (up to sets_to_win - 1
+# each) and the games in the current set (0-6 each), packed into one small integer
+# so a whole batch of matches advances by one game with a single table lookup
+def encode_state(s1: int, s2: int, g1: int, g2: int, sets_to_win: int = 2) -> int:
+    return ((s1 * sets_to_win + s2) * 7 + g1) * 7 + g2
+
+# next state for every (state, game winner) pair, using the play_set/play_match rules
+# indexed by 2 * state + (1 if player 1 won the game else 0)
+# finished matches are parked in in-play states + index of their final sets score
+@functools.lru_cache(maxsize=None)
+def build_transitions(sets_to_win: int = 2) -> tuple:
+    in_play = sets_to_win * sets_to_win * 7 * 7
+    finals = [(sets_to_win, s) for s in range(sets_to_win)] + [(s, sets_to_win) for s in range(sets_to_win)]
+    transitions = np.zeros(2 * in_play, dtype=np.intp)
+
+    for s1, s2, g1, g2 in itertools.product(range(sets_to_win), range(sets_to_win), range(7), range(7)):
+        for p1_won in (0, 1):
+            t1, t2 = s1, s2
+            p1 = g1 + p1_won
+            p2 = g2 + 1 - p1_won
+
+            if p1 == 6 and p2 < 5 or p1 == 7:
+                t1 += 1
+                p1, p2 = 0, 0
+            elif p2 == 6 and p1 < 5 or p2 == 7:
+                t2 += 1
+                p1, p2 = 0, 0
+
+            if t1 == sets_to_win or t2 == sets_to_win:
+                next_state = in_play + finals.index((t1, t2))
+            else:
+                next_state = encode_state(t1, t2, p1, p2, sets_to_win)
+            transitions[2 * encode_state(s1, s2, g1, g2, sets_to_win) + p1_won] = next_state
+
+    return transitions, finals
+
+# chance of player 1 winning the next game from every in-play state
+# every game, deuce included, is drawn with a single uniform against it
+# cached per format and p, so every set simulated at that p reuses the same table
+@functools.lru_cache(maxsize=None)
+def game_chances(p: float, sets_to_win: int = 2, tiebreak: bool = False) -> np.ndarray:
+    chances = np.full(sets_to_win * sets_to_win * 7 * 7, game_probability(p))
+    if tiebreak:
+        for s1, s2 in itertools.product(range(sets_to_win), range(sets_to_win)):
+            chances[encode_state(s1, s2, 6, 6, sets_to_win)] = tiebreak_probability(p)
+    return chances
+
+# simulates n_matches matches, returns the same counts play_games reports
+def play_matches_np(rng, n_matches: int, p: float = 0.55, best_of: int = 3, tiebreak: bool = False) -> dict:
+    sets_to_win = best_of // 2 + 1
+    transitions, finals = build_transitions(sets_to_win)
+    chances = game_chances(p, sets_to_win, tiebreak)
+    in_play = chances.size
+
+    counts = dict.fromkeys(COUNT_KEYS, 0)
+    finished = np.zeros(len(finals), dtype=np.int64)
+
+    # every match starts at 0-0, finished matches are dropped after each step
+    state = np.zeros(n_matches, dtype=np.intp)
+    while state.size:
+        won = rng.random(state.size) < chances[state]
+        p1_won = int(np.count_nonzero(won))
+        counts["p1_games"] += p1_won
+        counts["p2_games"] += won.size - p1_won
+
+        state = transitions[2 * state + won]
+        over = state >= in_play
+        if over.any():
+            finished += np.bincount(state[over] - in_play, minlength=len(finals))
+            state = state[~over]
+
+    # sets are read back from the final sets score of every match
+    for (s1, s2), n in zip(finals, finished.tolist()):
+        counts["p1_sets"] += s1 * n
+        counts["p2_sets"] += s2 * n
+        counts["p1_matches" if s1 == sets_to_win else "p2_matches"] += n
+
+    return counts
+
+# batched equivalent of play_games, returns counts instead of touching the globals
+# matches are simulated batch_size at a time to bound memory
+def play_games_np(n_matches: int, p: float = 0.55, seed=None, batch_size: int = 250_000,
+                  best_of: int = 3, tiebreak: bool = False) -> dict:
+    rng = np.random.default_rng(seed)
+    counts = dict.fromkeys(COUNT_KEYS, 0)
+
+    for start in range(0, n_matches, batch_size):
+        batch = play_matches_np(rng, min(batch_size, n_matches - start), p, best_of, tiebreak)
+        for key in counts:
+            counts[key] += batch[key]
+
+    return counts
+
+
+###################
+# Parallel runner #
+###################
+
+# runs one worker's share of the matches on its own random stream
+def run_worker(engine: str, n_matches: int, p: float, seed: np.random.SeedSequence) -> dict:
+    if engine == "numpy":
+        return play_games_np(n_matches, p, seed)
+
+    random.seed(int(seed.generate_state(1)[0]))
+    return count_matches(n_matches, p)
+
+# splits n_matches across a process pool and merges the partial counts
+# every worker's stream is spawned from one master seed and its share of matches
+# is fixed up front, so a given seed and worker count always gives the same counts
+def play_games_parallel(n_matches: int, p: float = 0.55, seed: int = 0, workers: int = None, engine: str = "numpy") -> dict:
+    workers = workers or os.cpu_count()
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [n_matches // workers + (i < n_matches % workers) for i in range(workers)]
+
+    counts = dict.fromkeys(COUNT_KEYS, 0)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(run_worker, [engine] * workers, shares, [p] * workers, seeds):
+            for key in counts:
+                counts[key] += partial[key]
+
+    return counts
+
+
+##################
+# Early stopping #
+##################
+
+# Wilson score interval for the match-win rate after n matches
+def wilson_interval(wins: int, n: int, confidence: float = 0.95) -> tuple:
+    z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+    rate = wins / n
+    centre = (rate + z * z / (2 * n)) / (1 + z * z / n)
+    half_width = z * math.sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return centre - half_width, centre + half_width
+
+# simulates batches of matches until the confidence interval on the match-win rate
+# is narrower than width, or max_matches have been played
+# returns the counts plus the interval that was reached
+# the python engine only plays best of 3 without tiebreaks
+def play_until_converged(p: float = 0.55, width: float = 0.02, confidence: float = 0.95, batch_size: int = 1000,
+                         max_matches: int = 10_000_000, seed=None, engine: str = "numpy",
+                         best_of: int = 3, tiebreak: bool = False) -> dict:
+    if batch_size < 1 or max_matches < 1:
+        raise ValueError(f"batch_size and max_matches must be at least 1, got {batch_size} and {max_matches}")
+    if engine == "python" and (best_of != 3 or tiebreak):
+        raise ValueError("the python engine only plays best of 3 without tiebreaks, use engine=\"numpy\"")
+    rng = np.random.default_rng(seed)
+    if engine == "python":
+        random.seed(seed)
+    counts = dict.fromkeys(COUNT_KEYS, 0)
+    n_matches = 0
+
+    while n_matches < max_matches:
+        size = min(batch_size, max_matches - n_matches)
+        batch = play_matches_np(rng, size, p, best_of, tiebreak) if engine == "numpy" else count_matches(size, p)
+        for key in counts:
+            counts[key] += batch[key]
+        n_matches += size
+
+        low, high = wilson_interval(counts["p1_matches"], n_matches, confidence)
+        if high - low < width:
+            break
+
+    counts["interval"] = (low, high)
+    return counts
+
+def print_converged(counts: dict, p: float = None):
+    low, high = counts["interval"]
+    print_results(counts, p)
+    print(f"interval:   {100 * low:.2f}% to {100 * high:.2f}%")
+
+
+#########
+# Sweep #
+#########
+
+# game, set and match win rates for every point-win probability and match format
+# method "exact" solves each row, "numpy" simulates n_matches per row
+# game and set results are cached per p, so every format reuses them
+def sweep(probabilities, best_of=(3,), tiebreak=(False,), method: str = "exact",
+          n_matches: int = 100_000, seed=None) -> list:
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for bo, tb, p in itertools.product(best_of, tiebreak, probabilities):
+        row = {"p": p, "best_of": bo, "tiebreak": tb}
+        if method == "exact":
+            row.update(exact_probabilities(p, bo, tb))
+        else:
+            counts = play_games_np(n_matches, p, rng, best_of=bo, tiebreak=tb)
+            row["game"] = counts["p1_games"] / (counts["p1_games"] + counts["p2_games"])
+            row["set"] = counts["p1_sets"] / (counts["p1_sets"] + counts["p2_sets"])
+            row["match"] = counts["p1_matches"] / n_matches
+        rows.append(row)
+
+    return rows
+
+# writes sweep rows as CSV, or as Parquet when the path ends in .parquet
+# Parquet needs pandas and pyarrow
+def write_table(rows: list, path: str):
+    if path.endswith(".parquet"):
+        import pandas as pd
+        pd.DataFrame(rows).to_parquet(path, index=False)
+        return
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    # python Tennis_Simulator.py [python|numpy] [n_matches] [--parallel]
+    # python Tennis_Simulator.py [python|numpy] --converge
+    # python Tennis_Simulator.py exact [p]
+    # python Tennis_Simulator.py sweep [output.csv|output.parquet]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    engine = args[0] if args else "python"
+
+    if engine == "exact":
+        p = float(args[1]) if len(args) > 1 else 0.55
+        for level, chance in exact_probabilities(p).items():
+            print(f"p1 {level + ':':7} {100 * chance:.2f}%")
+        sys.exit(0)
+
+    if engine == "sweep":
+        # 0.40 to 0.60 in steps of 0.01, best of 3 and 5, with and without tiebreaks
+        path = args[1] if len(args) > 1 else "sweep.csv"
+        probabilities = [round(0.40 + i / 100, 2) for i in range(21)]
+        write_table(sweep(probabilities, best_of=(3, 5), tiebreak=(False, True)), path)
+        print(f"Wrote {path}")
+        sys.exit(0)
+
+    n_matches = int(args[1]) if len(args) > 1 else 10000
+    if "--converge" in sys.argv:
+        print_converged(play_until_converged(engine=engine), 0.55)
+    elif "--parallel" in sys.argv:
+        print_results(play_games_parallel(n_matches, engine=engine), 0.55)
+    elif engine == "numpy":
+        print_results(play_games_np(n_matches), 0.55)
+    else:
+        play_games(n_matches)
@@ -0,0 +1,117 @@
+"""
+benchmark.py
+
+Times the Tennis_Simulator engines over a matrix of match counts and point-win
+probabilities and writes a JSON report.
+
+For every engine, match count and probability it records:
+- matches simulated per second
+- peak memory traced while simulating
+- agreement with the exact solver (z-score of the match-win rate)
+
+Usage:
+    python benchmark.py [report.json] [--quick] [--baseline old_report.json]
+
+--quick       only runs up to 1e5 matches
+--baseline    compares throughput against an earlier report and exits with 1
+              if any case got more than 20% slower
+"""
+
+import json, sys, time, math, tracemalloc, platform
+import Tennis_Simulator as ts
+
+MATCH_COUNTS = [10**3, 10**4, 10**5, 10**6, 10**7]
+PROBABILITIES = [0.45, 0.50, 0.55, 0.60]
+
+# the pure-Python loop runs at ~50k matches/s, so larger counts are skipped
+ENGINES = {
+    "python": {"run": lambda n, p: ts.count_matches(n, p), "max_matches": 10**5},
+    "numpy":  {"run": lambda n, p: ts.play_games_np(n, p, seed=0), "max_matches": 10**7},
+}
+
+SLOWDOWN_TOLERANCE = 0.20
+
+# timed and memory-traced in separate runs, as tracing slows the Python loop down ~3x
+def run_case(engine: str, n_matches: int, p: float) -> dict:
+    run = ENGINES[engine]["run"]
+    start = time.perf_counter()
+    counts = run(n_matches, p)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    run(n_matches, p)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    exact = ts.match_probability(p)
+    rate = counts["p1_matches"] / n_matches
+    standard_error = math.sqrt(exact * (1 - exact) / n_matches)
+
+    return {
+        "engine": engine,
+        "n_matches": n_matches,
+        "p": p,
+        "seconds": elapsed,
+        "matches_per_second": n_matches / elapsed,
+        "peak_memory_bytes": peak,
+        "match_rate": rate,
+        "exact_match_rate": exact,
+        "z_score": (rate - exact) / standard_error if standard_error else 0.0,
+    }
+
+def run_benchmarks(max_matches: int = MATCH_COUNTS[-1]) -> list:
+    results = []
+    for engine in ENGINES:
+        for n_matches in MATCH_COUNTS:
+            if n_matches > min(max_matches, ENGINES[engine]["max_matches"]):
+                continue
+            for p in PROBABILITIES:
+                result = run_case(engine, n_matches, p)
+                results.append(result)
+                print(f"{engine:7} {n_matches:>9} p={p:.2f}  "
+                      f"{result['matches_per_second']:>12,.0f} matches/s  "
+                      f"{result['peak_memory_bytes'] / 2**20:7.1f} MiB  z={result['z_score']:+.2f}")
+    return results
+
+# returns the cases that got more than SLOWDOWN_TOLERANCE slower than the baseline
+def find_regressions(results: list, baseline: list) -> list:
+    before = {(r["engine"], r["n_matches"], r["p"]): r["matches_per_second"] for r in baseline}
+    regressions = []
+    for r in results:
+        key = (r["engine"], r["n_matches"], r["p"])
+        if key in before and r["matches_per_second"] < before[key] * (1 - SLOWDOWN_TOLERANCE):
+            regressions.append({"case": key, "before": before[key], "after": r["matches_per_second"]})
+    return regressions
+
+def main():
+    args = sys.argv[1:]
+    baseline_path = args[args.index("--baseline") + 1] if "--baseline" in args else None
+    positional = [a for a in args if not a.startswith("--") and a != baseline_path]
+    report_path = positional[0] if positional else "benchmark_report.json"
+    max_matches = 10**5 if "--quick" in args else MATCH_COUNTS[-1]
+
+    results = run_benchmarks(max_matches)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+    regressions = []
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f)["results"])
+        report["regressions"] = regressions
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {report_path}")
+
+    for r in regressions:
+        print(f"Regression: {r['case']} {r['before']:,.0f} -> {r['after']:,.0f} matches/s")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
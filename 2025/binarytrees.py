@@ -1,146 +1,416 @@
-class Node:
-    # The class represents a single node in a binary tree 
-    def __init__(self, value, parent:'Node' = None, left_child:'Node' = None, right_child:'Node' = None):
-        self.value = value
-        self.parent = parent
-        self.left_child = left_child
-        self.right_child = right_child
-
-def tree_crawler(root):
-    global tree
-    index_nodes(tree, 0, 0)
-    
-    print(root.value)
-    print_tree(tree, root.value)
-    print("Current node: ", root.value)
-
-    print("Enter command: ")
-    print("0 to exit")
-    print("1 to go left")
-    print("2 to go right")
-    print("3 to go up")
-    print("l to add left node")
-    print("r to add right node")
-
-    cmd = input()
-
-    if cmd not in ["0", "1", "2", "3", "l", "r"]:
-        print("Invalid input")
-        # reload current node
-        return tree_crawler(root)
-    
-    if cmd == "1":
-        if root.left_child is not None:
-            # left child becomes selected node, current node becomes parent
-            return tree_crawler(root.left_child)
-        print("No left child")
-        # reload current node
-        return tree_crawler(root)
-    
-    if cmd == "2":
-        if root.right_child is not None:
-            # right child becomes selected node, current node becomes parent
-            return tree_crawler(root.right_child)
-        print("No right child")
-        # reload current node
-        return tree_crawler(root)
-    
-    if cmd == "3":
-        # load parent node, if there is one
-        if root.parent != None:
-            return tree_crawler(root.parent)
-        print("This is the seed")
-        return tree_crawler(root)
-    
-    if cmd == "l":
-        if root.left_child == None:
-            node_value = int(input("Node: "))
-            branch_builder(node_value, root, "l")
-            return tree_crawler(root.left_child)
+import mmap, sys
+from array import array
+
+class ArrayTree:
+    # The class represents a whole binary tree as flat arrays indexed by node id,
+    # rather than one object per node. Node 0 is the seed; parent, left and right
+    # hold node ids, with -1 where there is no node
+
+    # saved trees are an 8-byte header and the node count, followed by each column
+    # as native int64, so a file can be memory-mapped and read a column at a time
+    MAGIC = b"BTREE\x00\x00\x01"
+    COLUMNS = ("value", "parent", "left", "right", "depth")
+
+    def __init__(self, seed: int):
+        self.value = array("q", [seed])
+        self.parent = array("q", [-1])
+        self.left = array("q", [-1])
+        self.right = array("q", [-1])
+        self.depth = array("q", [0])
+        # number of levels, kept up to date as nodes are added
+        self.height = 1
+
+    def __len__(self):
+        return len(self.value)
+
+    # adds a new node below node on the given side ("l" or "r"), returns its id
+    def add_child(self, node: int, value: int, left_or_right: str) -> int:
+        child = len(self.value)
+        self.value.append(value)
+        self.parent.append(node)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.depth.append(self.depth[node] + 1)
+        self.height = max(self.height, self.depth[child] + 1)
+
+        if left_or_right == "l":
+            self.left[node] = child
         else:
-            y_or_n = input("Child already exists. Override? [y] or [n] ")
-            if y_or_n == "y":
-                node_value = int(input("Node: "))
-                root.left_child.value = node_value
-                return tree_crawler(root.left_child)
+            self.right[node] = child
+        return child
+
+    # builds a tree from its columns directly, without adding nodes one at a time
+    @classmethod
+    def from_columns(cls, value, parent, left, right, depth) -> "ArrayTree":
+        tree = cls.__new__(cls)
+        tree.value, tree.parent, tree.left, tree.right, tree.depth = value, parent, left, right, depth
+        tree.height = max(depth) + 1
+        return tree
+
+    # builds a tree from values in level order, None marking a missing child
+    # eg [1, 2, 3, None, 4] is 1 with children 2 and 3, and 4 as 2's right child
+    # nodes are created in level order, so entries 2k+1 and 2k+2 are node k's children
+    # the columns are filled in one pass and handed to from_columns
+    @classmethod
+    def from_level_order(cls, values) -> "ArrayTree":
+        values = list(values)
+        if not values or values[0] is None:
+            raise ValueError("a tree needs a seed value as its first entry")
+        value = array("q", [v for v in values if v is not None])
+        n = len(value)
+        parent, left, right = array("q", [-1]) * n, array("q", [-1]) * n, array("q", [-1]) * n
+        depth = array("q", [0]) * n
+
+        node = 1
+        for i in range(len(values) - 1):
+            if values[i + 1] is None:
+                continue
+            above = i >> 1
+            if above >= node:
+                raise ValueError(f"entry {i + 1} has no parent in the tree")
+            parent[node] = above
+            depth[node] = depth[above] + 1
+            if i & 1:
+                right[above] = node
+            else:
+                left[above] = node
+            node += 1
+        return cls.from_columns(value, parent, left, right, depth)
+
+    # builds a balanced binary search tree from sorted values, each subtree rooted
+    # at the middle of its range; ranges are kept on a stack rather than recursed into
+    # and the columns are filled in directly, as in from_level_order
+    @classmethod
+    def from_sorted(cls, values) -> "ArrayTree":
+        values = list(values)
+        n = len(values)
+        if not n:
+            raise ValueError("a tree needs at least one value")
+        value, depth = array("q", [0]) * n, array("q", [0]) * n
+        parent, left, right = array("q", [-1]) * n, array("q", [-1]) * n, array("q", [-1]) * n
+
+        # (lo, hi, parent, side) with side 0 for left and 1 for right
+        stack = [(0, n, -1, 0)]
+        node = 0
+        while stack:
+            lo, hi, above, side = stack.pop()
+            mid = (lo + hi - 1) // 2
+            value[node] = values[mid]
+            parent[node] = above
+            if above != -1:
+                depth[node] = depth[above] + 1
+                if side:
+                    right[above] = node
+                else:
+                    left[above] = node
+            if mid + 1 < hi:
+                stack.append((mid + 1, hi, node, 1))
+            if lo < mid:
+                stack.append((lo, mid, node, 0))
+            node += 1
+        return cls.from_columns(value, parent, left, right, depth)
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.MAGIC)
+            array("q", [len(self)]).tofile(f)
+            for column in self.COLUMNS:
+                getattr(self, column).tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> "ArrayTree":
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:8] != cls.MAGIC:
+                raise ValueError(f"{path} is not a saved tree")
+            n = int.from_bytes(mm[8:16], sys.byteorder)
+            if n < 1 or len(mm) != 16 + 8 * n * len(cls.COLUMNS):
+                raise ValueError(f"{path} is truncated or corrupt: its header says {n} nodes, "
+                                 f"which doesn't fit its {len(mm)} bytes")
+
+            columns = []
+            with memoryview(mm) as view:
+                for i in range(len(cls.COLUMNS)):
+                    start = 16 + 8 * n * i
+                    column = array("q")
+                    column.frombytes(view[start:start + 8 * n])
+                    columns.append(column)
+        return cls.from_columns(*columns)
+
+def tree_crawler(tree: ArrayTree, root: int = 0):
+    # each command selects the next node and goes round the loop again,
+    # so a session can run for any number of commands
+    while True:
+        update_view(tree, root)
+
+        print(tree.value[root])
+        print_tree(tree, root)
+        print("Current node: ", tree.value[root])
+
+        print("Enter command: ")
+        print("0 to exit")
+        print("1 to go left")
+        print("2 to go right")
+        print("3 to go up")
+        print("l to add left node")
+        print("r to add right node")
+        print("s to save tree")
+
+        cmd = input()
+
+        if cmd not in ["0", "1", "2", "3", "l", "r", "s"]:
+            print("Invalid input")
+            # reload current node
+            continue
+
+        if cmd == "0":
+            return tree.value[root]
+
+        if cmd == "s":
+            path = input("File: ")
+            tree.save(path)
+            print(f"Saved {len(tree)} nodes to {path}")
+            continue
+
+        if cmd == "1":
+            if tree.left[root] != -1:
+                # left child becomes selected node, current node becomes parent
+                root = tree.left[root]
+                continue
+            print("No left child")
+            # reload current node
+            continue
 
-    if cmd == "r":
-        if root.right_child == None:
+        if cmd == "2":
+            if tree.right[root] != -1:
+                # right child becomes selected node, current node becomes parent
+                root = tree.right[root]
+                continue
+            print("No right child")
+            # reload current node
+            continue
+
+        if cmd == "3":
+            # load parent node, if there is one
+            if tree.parent[root] != -1:
+                root = tree.parent[root]
+                continue
+            print("This is the seed")
+            continue
+
+        child = tree.left[root] if cmd == "l" else tree.right[root]
+        if child == -1:
             node_value = int(input("Node: "))
-            branch_builder(node_value, root, "r")
-            return tree_crawler(root.right_child)
+            root = branch_builder(node_value, tree, root, cmd)
+            node_added(tree, root)
         else:
             y_or_n = input("Child already exists. Override? [y] or [n] ")
             if y_or_n == "y":
                 node_value = int(input("Node: "))
-                root.right_child.value = node_value
-                return tree_crawler(root.right_child)
+                tree.value[child] = node_value
+                node_changed(tree, child)
+                root = child
 
-    return root.value
 
+# The tree is shown through a viewport: a window of levels around the selected
+# node, cut down to VIEW_WIDTH characters across. Only nodes inside the viewport
+# are indexed and rendered, so the cost follows what is on screen, not the tree.
+VIEW_ABOVE = 2      # levels kept above the selected node when the viewport moves
+VIEW_BELOW = 3      # levels shown below it
+VIEW_WIDTH = 128    # characters shown across
+MAX_LEVELS = VIEW_ABOVE + 1 + VIEW_BELOW
 
-def tree_depth(root: Node):
-    if root is None:
-        return 0
-    
-    l_depth = tree_depth(root.left_child)
-    r_depth = tree_depth(root.right_child)
-    
-    return max(l_depth, r_depth) + 1
-
+# node ids by heap position, one dict per level holding only the positions
+# inside the viewport; positions are relative to the viewport top, and preorder
+# visits each level left to right, so every dict is already in position order
 node_location = {}
 
-def index_nodes(root: Node, depth: int, index: int):
-    try:
-        node_location[depth]
-    except KeyError:
-        node_location[depth] = {i: -1 for i in range(0, 2**depth)}
-    
-    node_location[depth][index] = root.value
+# rendered (node line, connector line) per level of the viewport, drawn without
+# the selected node's highlight; a level is only dropped when an edit changes it
+rendered_levels = {}
+# column where each rendered node's position starts in its level's node line
+node_column = {}
+
+view_top = -1       # node at the top of the viewport
+view_levels = 0     # levels laid out below and including view_top
+view_left = 0       # first column shown
+
+# a position at depth d of the viewport is this many characters wide
+def slot_width(d: int) -> int:
+    return 2**(view_levels - d + 1)
+
+# depth and heap position of node relative to the viewport top,
+# or None if the node is above, below or beside the levels laid out
+def window_position(tree: ArrayTree, node: int):
+    depth = tree.depth[node] - tree.depth[view_top]
+    if not 0 <= depth < view_levels:
+        return None
+
+    index = 0
+    for bit in range(depth):
+        parent = tree.parent[node]
+        if tree.right[parent] == node:
+            index |= 1 << bit
+        node = parent
+    return (depth, index) if node == view_top else None
+
+# whether the label of the node at (depth, index) falls inside the columns shown
+def label_visible(depth: int, index: int) -> bool:
+    centre = index * slot_width(depth) + slot_width(depth) // 2
+    return view_left <= centre - 2 and centre + 2 <= view_left + VIEW_WIDTH
+
+# keeps node on screen: the viewport stays put while node is visible and not
+# stuck on the bottom row with children hidden below it, otherwise it moves to
+# VIEW_ABOVE levels above node and centres on it, re-indexing and re-rendering
+# a tree of up to MAX_LEVELS levels fits in the viewport whole, so it stays
+# pinned to the seed and is shown in full as it always was
+def update_view(tree: ArrayTree, node: int):
+    global view_top, view_levels, view_left
+    if view_top != -1:
+        location = window_position(tree, node)
+        if location is not None and label_visible(*location):
+            has_children = tree.left[node] != -1 or tree.right[node] != -1
+            if location[0] < view_levels - 1 or not has_children:
+                return
+
+    top = node
+    levels_up = tree.depth[node] if tree.height <= MAX_LEVELS else min(VIEW_ABOVE, tree.depth[node])
+    for _ in range(levels_up):
+        top = tree.parent[top]
+    view_top = top
+    view_levels = min(MAX_LEVELS, tree.height - tree.depth[top])
+
+    depth, index = window_position(tree, node)
+    centre = index * slot_width(depth) + slot_width(depth) // 2
+    view_left = max(0, min(centre - VIEW_WIDTH // 2, 2**(view_levels + 1) - VIEW_WIDTH))
+
+    index_nodes(tree, view_top)
+    rendered_levels.clear()
+    node_column.clear()
+
+def index_nodes(tree: ArrayTree, root: int):
+    node_location.clear()
+    # explicit stack of (node, depth, index); right is pushed before left so
+    # nodes still come off in preorder
+    stack = [(root, 0, 0)]
+
+    while stack:
+        node, depth, index = stack.pop()
+        # a subtree sits entirely under its root's position, so one that starts
+        # or ends outside the columns shown is skipped without visiting it
+        slot = slot_width(depth)
+        if (index + 1) * slot <= view_left or index * slot >= view_left + VIEW_WIDTH:
+            continue
 
-    if root.left_child is not None:
-        l_loc = 2*index
-        index_nodes(root.left_child, depth+1, l_loc)
-    if root.right_child is not None:
-        r_loc = 2*index + 1
-        index_nodes(root.right_child, depth+1, r_loc)
+        node_location.setdefault(depth, {})[index] = node
+        if depth + 1 == view_levels:
+            continue
 
-def print_tree(root, selected: int = None):
-    d_max = tree_depth(tree)
+        if tree.right[node] != -1:
+            stack.append((tree.right[node], depth+1, 2*index + 1))
+        if tree.left[node] != -1:
+            stack.append((tree.left[node], depth+1, 2*index))
+
+# updates the index and drops the rendered levels a newly added node changes:
+# its own level and its parent's connectors, or the whole viewport if the
+# tree grew a level, since that changes the width of every level
+def node_added(tree: ArrayTree, node: int):
+    global view_top
+    if view_top == -1:
+        return
+    if min(MAX_LEVELS, tree.height - tree.depth[view_top]) != view_levels:
+        view_top = -1
+        return
+
+    location = window_position(tree, node)
+    if location is None:
+        return
+    depth, index = location
+    slot = slot_width(depth)
+    if (index + 1) * slot <= view_left or index * slot >= view_left + VIEW_WIDTH:
+        return
+
+    level = node_location.setdefault(depth, {})
+    level[index] = node
+    node_location[depth] = dict(sorted(level.items()))
+    rendered_levels.pop(depth, None)
+    rendered_levels.pop(depth - 1, None)
+
+# drops the rendered level of a node whose value was overridden
+def node_changed(tree: ArrayTree, node: int):
+    location = window_position(tree, node)
+    if location is not None:
+        rendered_levels.pop(location[0], None)
+
+# joins (start column, text) pieces into the line shown in the viewport
+# a piece hanging off the left edge is cut; one pushed right by a wide value
+# before it is shifted along, like plain concatenation would
+def compose(pieces: list) -> str:
+    line = []
+    column = view_left
+    for start, text in pieces:
+        if start < view_left:
+            text = text[view_left - start:]
+            start = view_left
+        start = max(start, column)
+        line.append(" " * (start - column))
+        line.append(text)
+        column = start + len(text)
+    return "".join(line)[:VIEW_WIDTH]
+
+def render_level(tree: ArrayTree, d: int) -> tuple:
+    # each position is 2**(view_levels - d + 1) characters wide
+    half = 2**(view_levels - d)
+    labels = []
+    for i, node in node_location[d].items():
+        node_column[node] = i * 2 * half - view_left
+        labels.append((i * 2 * half, f"{' '*(half -1)}{tree.value[node]:2d}{' '*(half -1)}"))
+    node_line = compose(labels)
+
+    if d+1 == view_levels:
+        return node_line, ""
+
+    h = half // 2
+    connectors = []
+    for i, node in node_location[d].items():
+        left = tree.left[node] != -1
+        right = tree.right[node] != -1
+        # node has at least one child
+        if left or right:
+            connectors.append((i * 4 * h, f"{' '*h}{('_' if left else ' ')*(h-1)}{' |'}{('_' if right else ' ')*h}{' '*(h-1)}"))
+    return node_line, compose(connectors)
+
+# prints the viewport from the rendered levels, rendering only the levels an edit
+# dropped; moving the selection only re-splices the highlight into one line
+def print_tree(tree: ArrayTree, selected: int = None):
+    location = window_position(tree, selected) if selected is not None else None
 
     for d in node_location:
-        for i in node_location[d]:
-            # only print occupied nodes (ie not -1)
-            if node_location[d][i] != -1:
-                if node_location[d][i] == selected:
-                    print(f"{' '*(2**(d_max - d) -2)}>{node_location[d][i]:2d}<{' '*(2**(d_max - d) -2)}", end="")
-                else:
-                    print(f"{' '*(2**(d_max - d) -1)}{node_location[d][i]:2d}{' '*(2**(d_max - d) -1)}", end="")
-            else:
-                print(f"{' '*(2**(d_max - d) -1)}  {' '*(2**(d_max - d) -1)}", end="")
-        print()
-        if d+1 != d_max:
-            for i in node_location[d]:
-                # node has two children
-                if node_location[d+1][2*i] != -1 and node_location[d+1][2*i+1] != -1:
-                    print(f"{' '*(2**((d_max-d)-1))}{'_'*(2**((d_max-d)-1)-1)}{' |'}{'_'*2**((d_max-d)-1)}{' '*(2**((d_max-d)-1)-1)}", end="")
-                # node has only left child
-                elif node_location[d+1][2*i] != -1:
-                    print(f"{' '*(2**((d_max-d)-1))}{'_'*(2**((d_max-d)-1)-1)}{' |'}{' '*2**((d_max-d)-1)}{' '*(2**((d_max-d)-1)-1)}", end="")
-                # node has only right child
-                elif node_location[d+1][2*i+1] != -1:
-                    print(f"{' '*(2**((d_max-d)-1))}{' '*(2**((d_max-d)-1)-1)}{' |'}{'_'*2**((d_max-d)-1)}{' '*(2**((d_max-d)-1)-1)}", end="")
-                else:
-                    print(f"{' '*(2**((d_max-d)-1)-1)}{' '*2**((d_max-d)-1)}{'  '}{' '*2**((d_max-d)-1)}{' '*(2**((d_max-d)-1)-1)}", end="")
-        print()
+        if d not in rendered_levels:
+            rendered_levels[d] = render_level(tree, d)
+        node_line, connector_line = rendered_levels[d]
+
+        if location and d == location[0]:
+            # the label sits one character in from the middle of its position
+            label = f">{tree.value[selected]:2d}<"
+            col = node_column[selected] + 2**(view_levels - d) - 2
+            node_line = f"{node_line[:col]}{label}{node_line[col + len(label):]}"
+        print(node_line)
+        print(connector_line)
+
+    first = tree.depth[view_top] + 1
+    if view_levels < tree.height:
+        print(f"(showing levels {first}-{first + view_levels - 1} of {tree.height})")
 
 
-def branch_builder(new_node: int, root: Node, left_or_right: str):
-    if left_or_right == "l":
-        root.left_child = Node(new_node, root)
-    if left_or_right == "r":
-        root.right_child = Node(new_node, root)
+# adds the new node and returns its id
+def branch_builder(new_node: int, tree: ArrayTree, root: int, left_or_right: str) -> int:
+    return tree.add_child(root, new_node, left_or_right)
 
-tree = Node(int(input("Seed: ")))
+if __name__ == "__main__":
+    # python binarytrees.py [saved_tree.bin]
+    if len(sys.argv) > 1:
+        tree = ArrayTree.load(sys.argv[1])
+    else:
+        tree = ArrayTree(int(input("Seed: ")))
 
-tree_crawler(tree)
\ No newline at end of file
+    tree_crawler(tree)
\ No newline at end of file
@@ -1,58 +1,303 @@
-from modules.leader import Leader
-import re
-
-def read_text():
-    pattern = re.compile(
-        r'^\s*'                 # New line, including any whitespace
-        r'(.+?)\s\t'            # 1. rank
-        r'(.+?)\s\t'            # 2. name
-        r'(.+?)\s\t'            # 3. DOB
-        r'(.+?)\s\t'            # 4. DOD
-        r'(.+?)\s\t'            # 5. nation
-        r'(.+)'                 # 6. greatest acheivement
-
-    , re.UNICODE | re.IGNORECASE
-    )
-
-    leaders = {}
-    with open("raw_text.txt", "r", encoding="utf-8") as f:
+from modules.leader import Leader, LeaderColumns
+from modules.query import LeaderIndex
+from modules.export import export
+import re, sys, time, os, hashlib, pickle
+from concurrent.futures import ProcessPoolExecutor
+
+# parsed lines from the last --incremental run, with their fingerprints
+CACHE_PATH = "parse_cache.pickle"
+# bumped whenever what the cache holds changes, so an old cache is ignored
+CACHE_VERSION = 2
+FINGERPRINT_SIZE = 16
+
+LINE_PATTERN = re.compile(
+    r'^\s*'                 # New line, including any whitespace
+    r'(.+?)\s\t'            # 1. rank
+    r'(.+?)\s\t'            # 2. name
+    r'(.+?)\s\t'            # 3. DOB
+    r'(.+?)\s\t'            # 4. DOD
+    r'(.+?)\s\t'            # 5. nation
+    r'(.+)'                 # 6. greatest acheivement
+
+, re.UNICODE | re.IGNORECASE
+)
+
+# splits one line into its six fields, or returns None if it isn't a leader
+# rows are " \t" separated, so a plain split handles them. The split is only taken
+# when it cuts where LINE_PATTERN would: the line's only tabs are the five
+# separators and every field has text. Anything else, eg a tab inside a field,
+# goes through LINE_PATTERN
+def parse_fields(line: str):
+    line = line.strip()
+    fields = [field.strip() for field in line.split(" \t", 5)]
+    if len(fields) == 6 and all(fields) and line.count("\t") == 5:
+        return fields
+
+    if match := LINE_PATTERN.search(line):
+        return [field.strip() for field in match.groups()]
+    return None
+
+# builds the Leader for one line, or returns None if the line isn't one
+def parse_line(line: str):
+    if fields := parse_fields(line):
+        rank, name, dob, dod, nation, greatest_acheivement = fields
+
+        try:
+            return Leader(int(rank), name, dob, dod, nation, greatest_acheivement)
+        except:
+            print("Failed to parse:",line)
+    return None
+
+# yields a Leader per line of path, reading one line at a time so memory stays
+# constant however large the file is
+# if stats is given, it is filled in with the lines read and seconds taken
+def iter_leaders(path: str = "raw_text.txt", stats: dict = None):
+    start = time.perf_counter()
+    lines = 0
+    with open(path, "r", encoding="utf-8", buffering=1 << 20) as f:
         for line in f:
-            if match := pattern.search(line.strip()):
-                rank = int(match.group(1))
-                name = match.group(2).strip()
-                dob = match.group(3).strip()
-                dod = match.group(4).strip()
-                nation = match.group(5).strip()
-                greatest_acheivement = match.group(6).strip()
-                
-
-                try:
-                    leaders[name] = Leader(rank, name, dob, dod, nation, greatest_acheivement)
-                except:
-                    print("Failed to parse:",line)
-    return leaders  
-
-
-def main():
-    leaders = read_text()
-    print(len(leaders))
-    nations = {}
-    for leader in leaders:
-        if leaders[leader].nation not in nations:
-            nations[leaders[leader].nation] = [leaders[leader].name_and_rank]
-        else:
-            nations[leaders[leader].nation].append(leaders[leader].name_and_rank)
+            lines += 1
+            if leader := parse_line(line):
+                yield leader
+
+    if stats is not None:
+        stats["lines"] = lines
+        stats["seconds"] = time.perf_counter() - start
+
+# every leader in file order; a list rather than a dict keyed by name, so two
+# leaders sharing a name are both kept
+def read_text(path: str = "raw_text.txt"):
+    return list(iter_leaders(path))
+
+# the same leaders in column form, for inputs too large to keep as objects
+def read_columns(path: str = "raw_text.txt"):
+    return LeaderColumns(iter_leaders(path))
+
+# byte ranges splitting path into up to n_shards pieces; every range starts at the
+# beginning of a line, so each line is parsed by exactly one shard
+def shard_offsets(path: str, n_shards: int) -> list:
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, n_shards):
+            f.seek(size * i // n_shards)
+            # finish the line the offset landed in
+            f.readline()
+            bounds.append(max(f.tell(), bounds[-1]))
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+# parses the lines starting in [start, end) of path
+# leaders come back as Leader.to_tuple tuples, which unpickle in a fraction of
+# the time the objects would
+def parse_shard(path: str, start: int, end: int) -> list:
+    leaders = []
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            if leader := parse_line(line.decode("utf-8")):
+                leaders.append(leader.to_tuple())
+    return leaders
+
+# same leaders as read_text, parsed across a process pool and ordered by rank
+# shards are merged in file order before a stable sort, so equal ranks always
+# come out in the order they appear in the file
+def read_text_parallel(path: str = "raw_text.txt", workers: int = None) -> list:
+    workers = workers or os.cpu_count()
+    shards = shard_offsets(path, workers)
+    leaders = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for shard in pool.map(parse_shard, [path] * len(shards), *zip(*shards)):
+            leaders.extend(map(Leader.from_tuple, shard))
+    leaders.sort(key=lambda leader: leader.rank)
+    return leaders
+
+# fingerprint of one raw line, the key it is cached under
+def fingerprint(line: bytes) -> bytes:
+    return hashlib.blake2b(line, digest_size=FINGERPRINT_SIZE).digest()
+
+# digest of the first size bytes of path, as a hash object more lines can be added to
+def prefix_digest(path: str, size: int):
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        while size > 0 and (block := f.read(min(size, 1 << 20))):
+            digest.update(block)
+            size -= len(block)
+    return digest
+
+# what the last run left: the fingerprint of every line joined into one bytes, each
+# line's Leader.to_tuple (None where it wasn't a leader), and the size, line count
+# and digest of the part of the file up to its last line end
+# records are plain tuples rather than Leaders, as they load several times faster;
+# a missing, damaged or out of date cache reads as empty
+EMPTY_CACHE = {"fingerprints": b"", "records": [], "size": 0, "lines": 0, "digest": b""}
+
+def load_cache(cache_path: str = CACHE_PATH) -> dict:
+    try:
+        with open(cache_path, "rb") as f:
+            version, cache = pickle.load(f)
+        if version == CACHE_VERSION:
+            return cache
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError, AttributeError,
+            ImportError, TypeError, ValueError):
+        pass
+    return EMPTY_CACHE
+
+# written to a temporary file first so an interrupted run can't leave half a cache
+# the cache holds nothing shared or recursive, so the pickler's memo is turned off
+# with fast, which makes the dump several times quicker
+def save_cache(cache: dict, cache_path: str = CACHE_PATH):
+    with open(cache_path + ".tmp", "wb") as f:
+        pickler = pickle.Pickler(f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickler.fast = True
+        pickler.dump((CACHE_VERSION, cache))
+    os.replace(cache_path + ".tmp", cache_path)
+
+# same leaders as read_text, but only lines not seen on the last run are parsed
+# if the file still starts with the bytes the last run read, those lines are all
+# taken from the cache after hashing them in one go, and only what was added is read
+# line by line. Otherwise every line is fingerprinted and checked against the one at
+# its place in the last run; once a line has changed, the rest are looked up by
+# fingerprint. The cache is only rewritten when the lines have changed
+# if stats is given, it is filled in with the lines read and how many were parsed
+def read_text_incremental(path: str = "raw_text.txt", cache_path: str = CACHE_PATH,
+                          stats: dict = None) -> list:
+    cache = load_cache(cache_path)
+    fingerprints, records = cache["fingerprints"], cache["records"]
+    size, first = cache["size"], cache["lines"]
+    digest = prefix_digest(path, size) if 0 < size <= os.path.getsize(path) else None
+    if digest is None or digest.digest() != cache["digest"]:
+        digest, size, first = hashlib.blake2b(), 0, 0
+    leaders = [Leader.from_tuple(record) for record in records[:first] if record]
+    keys = [fingerprints[:FINGERPRINT_SIZE * first]]
+    current = records[:first]
+
+    # fingerprint -> record, built the first time a line isn't where it was on the
+    # last run
+    known = None
+    parsed = 0
+    with open(path, "rb", buffering=1 << 20) as f:
+        f.seek(size)
+        for i, line in enumerate(f, first):
+            key = fingerprint(line)
+            if known is None and key == fingerprints[FINGERPRINT_SIZE * i:FINGERPRINT_SIZE * (i + 1)]:
+                record = records[i]
+                leader = record and Leader.from_tuple(record)
+            else:
+                if known is None:
+                    # the lines before this one matched where they were, so the
+                    # lookup only needs the last run's lines from here on
+                    known = {fingerprints[FINGERPRINT_SIZE * j:FINGERPRINT_SIZE * (j + 1)]: records[j]
+                             for j in range(i, len(records))}
+                if key in known:
+                    record = known[key]
+                    leader = record and Leader.from_tuple(record)
+                else:
+                    leader = parse_line(line.decode("utf-8"))
+                    record = leader and leader.to_tuple()
+                    known[key] = record
+                    parsed += 1
+            keys.append(key)
+            current.append(record)
+            if leader:
+                leaders.append(leader)
+            # a last line with no line end may still be added to, so it isn't
+            # counted as read
+            if line.endswith(b"\n"):
+                digest.update(line)
+                size += len(line)
+                first = i + 1
+
+    if known is not None or len(current) != len(records) or size != cache["size"]:
+        save_cache({"fingerprints": b"".join(keys), "records": current, "size": size,
+                    "lines": first, "digest": digest.digest()}, cache_path)
+
+    if stats is not None:
+        stats["lines"] = len(current)
+        stats["parsed"] = parsed
+    return leaders
+
+# rewrites path to hold lines, leaving the part that already matches untouched:
+# the file is compared line by line and only rewritten from the first difference
+# returns how many lines were written
+def patch_file(path: str, lines: list) -> int:
+    new = [line.replace("\n", os.linesep).encode("utf-8") for line in lines]
+    mode = "r+b" if os.path.exists(path) else "w+b"
+    with open(path, mode) as f:
+        offset = 0
+        first = 0
+        for old in f:
+            if first == len(new) or old != new[first]:
+                break
+            offset += len(old)
+            first += 1
+        f.seek(offset)
+        f.writelines(new[first:])
+        f.truncate()
+    return len(new) - first
+
+# the lines of processed.txt and sorted_by_nations.txt
+def render_outputs(leaders: list):
+    index = LeaderIndex(leaders)
+    processed = [f"{leader}\n" for leader in leaders]
+    by_nations = []
+    for nation, count in index.nation_sizes():
+        names = ", ".join(leader.name_and_rank for leader in index.nation(nation))
+        by_nations.append(f"{nation} ({count}): {names}\n")
+    return processed, by_nations
+
+# streams a file through the parser without keeping the results and reports throughput
+def benchmark_parse(path: str):
+    stats = {}
+    count = sum(1 for _ in iter_leaders(path, stats))
+    print(f"Parsed {count} leaders from {stats['lines']} lines in {stats['seconds']:.2f}s "
+          f"({stats['lines'] / stats['seconds']:,.0f} lines/s)")
+
+
+def main(parallel: bool = False, incremental: bool = False, exports: list = ()):
+    if incremental:
+        stats = {}
+        leaders = read_text_incremental(stats=stats)
+        print(f"{len(leaders)} ({stats['parsed']} of {stats['lines']} lines parsed)")
+    else:
+        leaders = read_text_parallel() if parallel else read_text()
+        print(len(leaders))
+    processed, by_nations = render_outputs(leaders)
+    for path in exports:
+        export(leaders, path)
+
+    if incremental:
+        written = patch_file("processed.txt", processed)
+        written += patch_file("sorted_by_nations.txt", by_nations)
+        print(f"{written} output lines rewritten")
+        return
 
     with open("processed.txt", "w", encoding="utf-8") as f:
-        for leader in leaders:
-            f.write(f"{leaders[leader]}\n")
+        f.writelines(processed)
     
     with open("sorted_by_nations.txt", "w", encoding="utf-8") as f:
-        for nation in sorted(nations, key=lambda n: len(nations[n]), reverse=True):
-            leaders = ", ".join(leader for leader in nations[nation])
-            f.write(f"{nation} ({len(nations[nation])}): {leaders}\n")      
+        f.writelines(by_nations)
         
 
 
 if __name__ == "__main__":
-    main()
+    # python main.py                  process raw_text.txt
+    # python main.py --stream <file>  parse a file and report lines per second
+    # python main.py --parallel       process raw_text.txt across all cores
+    # python main.py --incremental    only re-parse lines changed since the last run
+    # python main.py --export <file>  also write the leaders to a .csv, .jsonl or
+    #                                 .leaders file, add .gz/.bz2/.xz to compress
+    exports = [sys.argv[i + 1] for i, arg in enumerate(sys.argv[:-1]) if arg == "--export"]
+    if "--stream" in sys.argv:
+        benchmark_parse(sys.argv[sys.argv.index("--stream") + 1])
+    elif "--parallel" in sys.argv:
+        main(parallel=True, exports=exports)
+    elif "--incremental" in sys.argv:
+        main(incremental=True, exports=exports)
+    else:
+        main(exports=exports)
@@ -0,0 +1,147 @@
+import bz2, csv, gzip, io, json, lzma, os, sys
+from functools import partial
+from array import array
+from modules.leader import Leader, LeaderColumns, parse_year
+
+# Writers for processed leaders, picked by file extension:
+#   .csv       one row per leader with a header
+#   .jsonl     one JSON object per line
+#   .leaders   columnar binary, see write_columns
+# Adding .gz, .bz2 or .xz on the end compresses the file as it is written.
+
+FIELDS = ("rank", "name", "DOB", "DOD", "birth_year", "death_year",
+          "nation", "dynasty", "greatest_acheivement")
+
+# gzip's default level 9 is ~3x slower than 6 for a file barely any smaller
+COMPRESSORS = {".gz": partial(gzip.open, compresslevel=6), ".bz2": bz2.open, ".xz": lzma.open}
+
+BUFFER_SIZE = 1 << 20
+# rows are handed to the writer in batches of this many
+BATCH_SIZE = 10_000
+
+# opens path for writing in binary, compressed if its extension asks for it
+def open_output(path: str):
+    compressor = COMPRESSORS.get(os.path.splitext(path)[1])
+    if compressor:
+        return io.BufferedWriter(compressor(path, "wb"), BUFFER_SIZE)
+    return open(path, "wb", buffering=BUFFER_SIZE)
+
+def open_input(path: str):
+    compressor = COMPRESSORS.get(os.path.splitext(path)[1])
+    if compressor:
+        return io.BufferedReader(compressor(path, "rb"), BUFFER_SIZE)
+    return open(path, "rb", buffering=BUFFER_SIZE)
+
+def record(leader: Leader) -> tuple:
+    return (leader.rank, leader.name, leader.DOB, leader.DOD, leader.birth_year,
+            leader.death_year, leader.nation, leader.dynasty, leader.greatest_acheivement)
+
+def batches(leaders, size: int = BATCH_SIZE):
+    batch = []
+    for leader in leaders:
+        batch.append(record(leader))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def write_csv(leaders, path: str):
+    with open_output(path) as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for batch in batches(leaders):
+            writer.writerows(batch)
+
+def write_jsonl(leaders, path: str):
+    with open_output(path) as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="\n") as f:
+        for batch in batches(leaders):
+            f.write("".join(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n"
+                            for row in batch))
+
+# Columnar binary layout, all integers native 8 byte:
+#   MAGIC, number of leaders
+#   rank, birth_year, death_year, nation, dynasty    one integer per leader;
+#                                                    years use MISSING for N/A,
+#                                                    nation/dynasty index names (-1 for none)
+#   name, DOB, DOD, greatest_acheivement, names      string columns, each stored as
+#                                                    its length, end offsets, utf-8 bytes
+MAGIC = b"LEADERS\x01"
+INT_COLUMNS = ("rank", "birth_year", "death_year", "nation", "dynasty")
+STRING_COLUMNS = ("name", "DOB", "DOD", "greatest_acheivement", "names")
+MISSING = -2**63
+
+def write_strings(f, strings: list):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("q", [len(encoded)])
+    end = 0
+    for s in encoded:
+        end += len(s)
+        offsets.append(end)
+    offsets.tofile(f)
+    f.write(b"".join(encoded))
+
+def read_strings(f) -> list:
+    count = array("q")
+    count.frombytes(f.read(8))
+    offsets = array("q")
+    offsets.frombytes(f.read(8 * count[0]))
+    data = f.read(offsets[-1] if offsets else 0)
+    strings = []
+    start = 0
+    for end in offsets:
+        strings.append(data[start:end].decode("utf-8"))
+        start = end
+    return strings
+
+def write_columns(leaders, path: str):
+    columns = leaders if isinstance(leaders, LeaderColumns) else LeaderColumns(leaders)
+    years = {"birth_year": array("q"), "death_year": array("q")}
+    for dob, dod in zip(columns.DOB, columns.DOD):
+        birth, death = parse_year(dob), parse_year(dod)
+        years["birth_year"].append(MISSING if birth is None else birth)
+        years["death_year"].append(MISSING if death is None else death)
+
+    with open_output(path) as f:
+        f.write(MAGIC)
+        array("q", [len(columns)]).tofile(f)
+        for column in INT_COLUMNS:
+            values = years[column] if column in years else getattr(columns, column)
+            array("q", values).tofile(f)
+        for column in STRING_COLUMNS:
+            write_strings(f, getattr(columns, column))
+
+# reads a file written by write_columns back into a LeaderColumns
+def read_columns(path: str) -> LeaderColumns:
+    columns = LeaderColumns()
+    with open_input(path) as f:
+        if f.read(8) != MAGIC:
+            raise ValueError(f"{path} is not a leaders column file")
+        n = int.from_bytes(f.read(8), sys.byteorder)
+        ints = {}
+        for column in INT_COLUMNS:
+            ints[column] = array("q")
+            ints[column].frombytes(f.read(8 * n))
+        strings = {column: read_strings(f) for column in STRING_COLUMNS}
+
+    columns.rank = array("l", ints["rank"])
+    columns.nation = array("l", ints["nation"])
+    columns.dynasty = array("l", ints["dynasty"])
+    columns.name = strings["name"]
+    columns.DOB = strings["DOB"]
+    columns.DOD = strings["DOD"]
+    columns.greatest_acheivement = strings["greatest_acheivement"]
+    columns.names = strings["names"]
+    columns._codes = {name: i for i, name in enumerate(columns.names)}
+    return columns
+
+EXPORTERS = {".csv": write_csv, ".jsonl": write_jsonl, ".leaders": write_columns}
+
+# writes leaders to path in the format its extension names
+def export(leaders, path: str):
+    root, extension = os.path.splitext(path)
+    if extension in COMPRESSORS:
+        extension = os.path.splitext(root)[1]
+    if extension not in EXPORTERS:
+        raise ValueError(f"Don't know how to export to {path}, use one of {', '.join(EXPORTERS)}")
+    EXPORTERS[extension](leaders, path)
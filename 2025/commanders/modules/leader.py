@@ -1,6 +1,24 @@
 import re
+from array import array
+
+# splits "Nation (Dynasty)" into its two parts
+DYNASTY_PATTERN = re.compile(r'(.+?)\((.+?)\)')
+
+# a year as written in the source, e.g. "1162", "356BC" or "316 BC"
+YEAR_PATTERN = re.compile(r'^\s*(\d+)\s*(BC)?\s*$', re.IGNORECASE)
+
+# turns a written year into a number, BC years negative, or None for "N/A"
+def parse_year(text):
+    if match := YEAR_PATTERN.match(text):
+        year = int(match.group(1))
+        return -year if match.group(2) else year
+    return None
 
 class Leader:
+    # __slots__ keeps each leader to a fixed set of fields with no per-instance
+    # __dict__, which matters once there are millions of them
+    __slots__ = ("rank", "name", "DOB", "DOD", "nation", "dynasty", "greatest_acheivement")
+
     def __init__(self, rank, name, DOB, DOD, nation, greatest_acheivement):
         self.rank = rank   
         self.name = name
@@ -8,15 +26,41 @@ class Leader:
         self.DOD = DOD
         self.nation = nation
         self.greatest_acheivement = greatest_acheivement
-        self.name_and_rank = f"{self.name} ({self.rank})"
 
         # seperate country from dynasty where applicable
-        pattern = r'(.+?)\((.+?)\)'
-        if match := re.match(pattern, self.nation):
+        if "(" in self.nation and (match := DYNASTY_PATTERN.match(self.nation)):
             self.nation = match.group(1).strip()
             self.dynasty = match.group(2)
         else:
             self.dynasty = None
+
+    # the fields as a plain tuple in __slots__ order, and a leader rebuilt from one
+    # without splitting the nation again; tuples pickle far cheaper than slotted
+    # objects, so this is what goes between processes and into caches
+    def to_tuple(self) -> tuple:
+        return (self.rank, self.name, self.DOB, self.DOD, self.nation, self.dynasty,
+                self.greatest_acheivement)
+
+    @classmethod
+    def from_tuple(cls, fields: tuple) -> "Leader":
+        leader = cls.__new__(cls)
+        (leader.rank, leader.name, leader.DOB, leader.DOD, leader.nation, leader.dynasty,
+         leader.greatest_acheivement) = fields
+        return leader
+
+    # built when asked for rather than stored on every leader
+    @property
+    def name_and_rank(self):
+        return f"{self.name} ({self.rank})"
+
+    @property
+    def birth_year(self):
+        return parse_year(self.DOB)
+
+    @property
+    def death_year(self):
+        return parse_year(self.DOD)
+
     def __str__(self):
         #str_DOB = str(self.DOB).strip("-")
         #if self.DOB < 0:
@@ -24,5 +68,62 @@ class Leader:
         #str_DOD = str(self.DOD).strip("-")
         #if self.DOD < 0:
         #    str_DOD += " BC"
-        return f"{self.rank:3}. {self.name} ({self.DOB}–{self.DOD}, {self.nation})" 
-    
+        return f"{self.rank:3}. {self.name} ({self.DOB}–{self.DOD}, {self.nation})"
+
+
+class LeaderColumns:
+    # Column store for large numbers of leaders: one array or list per field
+    # instead of one object per leader. Nations and dynasties repeat a lot, so
+    # they are kept once in `names` and stored per leader as an index into it
+    # (-1 for no dynasty). Indexing or iterating gives back Leader objects.
+    def __init__(self, leaders=()):
+        self.rank = array("l")
+        self.name = []
+        self.DOB = []
+        self.DOD = []
+        self.nation = array("l")
+        self.dynasty = array("l")
+        self.greatest_acheivement = []
+        self.names = []
+        self._codes = {}
+        self.extend(leaders)
+
+    def __len__(self):
+        return len(self.rank)
+
+    def _code(self, name):
+        if name is None:
+            return -1
+        if name not in self._codes:
+            self._codes[name] = len(self.names)
+            self.names.append(name)
+        return self._codes[name]
+
+    def append(self, leader: Leader):
+        self.rank.append(leader.rank)
+        self.name.append(leader.name)
+        self.DOB.append(leader.DOB)
+        self.DOD.append(leader.DOD)
+        self.nation.append(self._code(leader.nation))
+        self.dynasty.append(self._code(leader.dynasty))
+        self.greatest_acheivement.append(leader.greatest_acheivement)
+
+    def extend(self, leaders):
+        for leader in leaders:
+            self.append(leader)
+
+    def __getitem__(self, i) -> Leader:
+        # nation and dynasty are already split, so the fields are set directly
+        leader = Leader.__new__(Leader)
+        leader.rank = self.rank[i]
+        leader.name = self.name[i]
+        leader.DOB = self.DOB[i]
+        leader.DOD = self.DOD[i]
+        leader.nation = self.names[self.nation[i]]
+        leader.dynasty = self.names[self.dynasty[i]] if self.dynasty[i] != -1 else None
+        leader.greatest_acheivement = self.greatest_acheivement[i]
+        return leader
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
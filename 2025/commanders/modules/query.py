@@ -0,0 +1,81 @@
+from bisect import bisect_left, bisect_right
+from modules.leader import Leader
+
+class LeaderIndex:
+    # Built once after parsing so repeated questions don't each scan every leader.
+    # Leaders are kept in rank order and every index holds positions into that
+    # list, so anything grouped (by nation, dynasty) also comes back in rank order:
+    #   by_nation / by_dynasty   hash index, name -> positions
+    #   ranks                    sorted ranks, for rank ranges
+    #   births / deaths          (year, position) sorted by year, BC years negative
+    def __init__(self, leaders):
+        self.leaders = sorted(leaders, key=lambda leader: leader.rank)
+        self.ranks = [leader.rank for leader in self.leaders]
+        self.by_nation = {}
+        self.by_dynasty = {}
+        births = []
+        deaths = []
+
+        for i, leader in enumerate(self.leaders):
+            self.by_nation.setdefault(leader.nation, []).append(i)
+            if leader.dynasty is not None:
+                self.by_dynasty.setdefault(leader.dynasty, []).append(i)
+            if (year := leader.birth_year) is not None:
+                births.append((year, i))
+            if (year := leader.death_year) is not None:
+                deaths.append((year, i))
+
+        births.sort()
+        deaths.sort()
+        self.birth_years = [year for year, _ in births]
+        self.birth_positions = [i for _, i in births]
+        self.death_years = [year for year, _ in deaths]
+        self.death_positions = [i for _, i in deaths]
+
+    def __len__(self):
+        return len(self.leaders)
+
+    def _pick(self, positions) -> list:
+        return [self.leaders[i] for i in positions]
+
+    def nation(self, nation: str) -> list:
+        return self._pick(self.by_nation.get(nation, ()))
+
+    def dynasty(self, dynasty: str) -> list:
+        return self._pick(self.by_dynasty.get(dynasty, ()))
+
+    # the n best ranked leaders of a nation
+    def top(self, nation: str, n: int = 10) -> list:
+        return self._pick(self.by_nation.get(nation, ())[:n])
+
+    # leaders ranked from low to high, inclusive
+    def rank_range(self, low: int, high: int) -> list:
+        return self.leaders[bisect_left(self.ranks, low):bisect_right(self.ranks, high)]
+
+    def rank(self, rank: int) -> Leader:
+        i = bisect_left(self.ranks, rank)
+        if i < len(self.ranks) and self.ranks[i] == rank:
+            return self.leaders[i]
+        return None
+
+    # leaders born between two years, inclusive, use negative years for BC
+    def born_between(self, start: int, end: int) -> list:
+        lo = bisect_left(self.birth_years, start)
+        hi = bisect_right(self.birth_years, end)
+        return self._pick(self.birth_positions[lo:hi])
+
+    def died_between(self, start: int, end: int) -> list:
+        lo = bisect_left(self.death_years, start)
+        hi = bisect_right(self.death_years, end)
+        return self._pick(self.death_positions[lo:hi])
+
+    # leaders born in a century: 12 is 1101-1200, -4 is 400BC-301BC
+    def born_in_century(self, century: int) -> list:
+        if century > 0:
+            return self.born_between((century - 1) * 100 + 1, century * 100)
+        return self.born_between(century * 100, (century + 1) * 100 - 1)
+
+    # (nation, number of leaders), largest first; ties keep rank order of first leader
+    def nation_sizes(self) -> list:
+        sizes = [(nation, len(positions)) for nation, positions in self.by_nation.items()]
+        return sorted(sizes, key=lambda size: size[1], reverse=True)
@@ -0,0 +1,198 @@
+"""
+benchmark.py
+
+Times every pattern in patterns.py over a generated corpus and checks each one
+for catastrophic backtracking, then writes a JSON report.
+
+For every pattern it records:
+- MB/s and matches found scanning the corpus with finditer
+- growth: how much slower it gets as a hostile input grows, as an exponent
+  (1 is linear, 2 quadratic). Each input in HOSTILE_INPUTS is grown until a scan
+  takes MIN_SECONDS, so the timings are well clear of timer noise, and the
+  exponent is fitted over GROWTH_LENGTHS doublings from there. The input that grows
+  worst is kept; a pattern is flagged as a backtracking risk if every one of its
+  doublings is over RISK_EXPONENT, or if it is too slow to finish
+
+Usage:
+    python benchmark.py [report.json] [--size MB] [--seed n]
+
+--size   corpus size in MB (default 8), eg 1024 for a GB; the corpus is built
+         in memory, so it needs that much RAM
+"""
+
+import json, math, platform, random, statistics, sys, time
+from patterns import PATTERNS
+
+DEFAULT_SIZE_MB = 8
+
+# a block of this many bytes of generated text is built and repeated up to the corpus size
+BLOCK_SIZE = 1 << 20
+
+FIRST_NAMES = ["Alice", "Bob", "Charlie", "David", "Emma", "Frank", "Gabriel", "Hannah"]
+WORDS = ["the", "cat", "sat", "on", "car", "carpet", "dog", "mouse", "brown", "park",
+         "if", "then", "rains", "we", "stay", "go", "report", "connection", "failed"]
+LEVELS = ["INFO", "WARNING", "ERROR", "DEBUG"]
+
+def random_line(rng: random.Random) -> str:
+    name = rng.choice(FIRST_NAMES)
+    words = " ".join(rng.choices(WORDS, k=rng.randint(3, 12)))
+    kind = rng.randrange(8)
+    if kind == 0:
+        return f"{name}: {name.lower()}{rng.randint(1, 99)}@example.co.uk, {words}"
+    if kind == 1:
+        return f"{name}: 07 {rng.randint(100, 999)} {rng.randint(100, 999)} {rng.randint(100, 999)} {words}"
+    if kind == 2:
+        return (f"[2025-{rng.randint(1, 12):02}-{rng.randint(1, 28):02} {rng.randint(0, 23):02}:"
+                f"{rng.randint(0, 59):02}:{rng.randint(0, 59):02}] {rng.choice(LEVELS)}: {words}")
+    if kind == 3:
+        return f'He said "{words}" on {rng.randint(1, 28):02}/{rng.randint(1, 12):02}/20{rng.randint(10, 25)}'
+    if kind == 4:
+        return f"If it {words}, then visit https://example.com/{rng.choice(WORDS)} #{rng.choice(WORDS)}"
+    if kind == 5:
+        return f"p{rng.randint(1, 20)}: {name}#{rng.randint(1000, 9999)}! and %{rng.randint(1, 99)} {words}"
+    if kind == 6:
+        return f"<title>{words}</title> Name: {name} Doe, Age: {rng.randint(18, 90)}"
+    return f"{words} {words.split()[0]} {words}."
+
+def generate_corpus(size_mb: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    length = 0
+    while length < BLOCK_SIZE:
+        lines.append(random_line(rng))
+        length += len(lines[-1]) + 1
+    block = "\n".join(lines) + "\n"
+
+    size = int(size_mb * 2**20)
+    return (block * (size // len(block) + 1))[:size]
+
+# inputs that make backtracking patterns do the most work, built to length n
+HOSTILE_INPUTS = {
+    "word_run": lambda n: "a" * n,
+    "mixed_word_run": lambda n: ("aB1" * n)[:n],
+    "space_run": lambda n: "a" + " " * n,
+    "unclosed_quote": lambda n: '"' + "a" * n,
+    "repeated_if": lambda n: ("if " * n)[:n],
+    "repeated_tag": lambda n: ("<title>" * n)[:n],
+    "repeated_bracket": lambda n: ("[" * n),
+    "repeated_url": lambda n: ("http://a" * n)[:n],
+    "digit_run": lambda n: "1" * n,
+    "dotted_run": lambda n: ("a." * n)[:n],
+}
+
+# hostile inputs start at HOSTILE_START characters and double until a scan takes
+# MIN_SECONDS; one still quicker than that at HOSTILE_MAX isn't doing much work at all
+HOSTILE_START = 1000
+HOSTILE_MAX = 1 << 22
+MIN_SECONDS = 0.01
+# how many lengths, each double the last, the growth is fitted over
+GROWTH_LENGTHS = 3
+RISK_EXPONENT = 1.5
+# a hostile input taking longer than this is flagged without trying longer ones
+MAX_SECONDS = 2.0
+
+def scan(pattern, text: str) -> int:
+    return sum(1 for _ in pattern.finditer(text))
+
+# best of a few runs, so timer noise doesn't read as growth
+def time_scan(pattern, text: str, repeats: int = 3) -> float:
+    best = math.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scan(pattern, text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# the growth exponent fitted over GROWTH_LENGTHS lengths of one hostile input, and
+# the smallest exponent of any one doubling between them
+# inf for both if a scan takes over MAX_SECONDS, None if it is too quick to time
+def input_growth(pattern, build) -> tuple:
+    n = HOSTILE_START
+    while (seconds := time_scan(pattern, build(n))) < MIN_SECONDS:
+        if n >= HOSTILE_MAX:
+            return None
+        n *= 2
+
+    lengths, times = [n], [seconds]
+    while times[-1] <= MAX_SECONDS and len(times) < GROWTH_LENGTHS:
+        lengths.append(2 * lengths[-1])
+        times.append(time_scan(pattern, build(lengths[-1])))
+    if times[-1] > MAX_SECONDS:
+        return math.inf, math.inf
+
+    fitted = statistics.linear_regression([math.log2(n) for n in lengths], [math.log2(t) for t in times]).slope
+    slowest = min(math.log2(after / before) for before, after in zip(times, times[1:]))
+    return fitted, slowest
+
+# the growth of pattern on the hostile input it copes with worst, as
+# (fitted exponent, smallest exponent of any doubling, input name)
+# worst means the input whose smallest doubling is biggest, so one noisy doubling
+# can't make a linear pattern look like a risk
+def backtracking_growth(pattern) -> tuple:
+    worst = (0.0, 0.0, None)
+    for name, build in HOSTILE_INPUTS.items():
+        growth = input_growth(pattern, build)
+        if growth is None:
+            continue
+        fitted, slowest = growth
+        if math.isinf(slowest):
+            return fitted, slowest, name
+        if worst[2] is None or slowest > worst[1]:
+            worst = (fitted, slowest, name)
+    return worst
+
+def run_case(name: str, corpus: str) -> dict:
+    pattern = PATTERNS[name]
+    start = time.perf_counter()
+    matches = scan(pattern, corpus)
+    elapsed = time.perf_counter() - start
+    exponent, slowest, hostile_input = backtracking_growth(pattern)
+
+    return {
+        "pattern": name,
+        "regex": pattern.pattern,
+        "seconds": elapsed,
+        "mb_per_second": len(corpus) / 2**20 / elapsed,
+        "matches": matches,
+        "growth_exponent": exponent if math.isfinite(exponent) else None,
+        "worst_input": hostile_input,
+        "backtracking_risk": slowest > RISK_EXPONENT,
+    }
+
+def run_benchmarks(size_mb: float, seed: int = 0) -> list:
+    corpus = generate_corpus(size_mb, seed)
+    results = []
+    for name in PATTERNS:
+        result = run_case(name, corpus)
+        results.append(result)
+        growth = "too slow" if result["growth_exponent"] is None else f"n^{result['growth_exponent']:.1f}"
+        flag = f"  RISK ({result['worst_input']})" if result["backtracking_risk"] else ""
+        print(f"{name:15} {result['mb_per_second']:9,.1f} MB/s {result['matches']:>10} matches  {growth:>8}{flag}")
+    return results
+
+def main():
+    args = sys.argv[1:]
+    size_mb = float(args[args.index("--size") + 1]) if "--size" in args else DEFAULT_SIZE_MB
+    seed = int(args[args.index("--seed") + 1]) if "--seed" in args else 0
+    values = {args[i + 1] for i, a in enumerate(args[:-1]) if a in ("--size", "--seed")}
+    positional = [a for a in args if not a.startswith("--") and a not in values]
+    report_path = positional[0] if positional else "benchmark_report.json"
+
+    results = run_benchmarks(size_mb, seed)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus_mb": size_mb,
+        "results": results,
+        "risks": [r["pattern"] for r in results if r["backtracking_risk"]],
+    }
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {report_path}")
+    if report["risks"]:
+        print("Backtracking risks:", ", ".join(report["risks"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+log_parser.py
+
+Streams log files of "[YYYY-MM-DD HH:MM:SS] LEVEL: message" lines into batches
+of (timestamp, level, message) records. All three fields come out of one
+LOG_LINE match per line, and lines that aren't in that format are skipped.
+
+- files are read in CHUNK_SIZE pieces cut at line ends, and each piece is
+  scanned with a single findall, so the per-line work stays inside the regex engine
+- plain files are memory-mapped, so a multi-GB file is never read in one go
+- .gz, .bz2 and .xz files are decompressed as they are read
+- parse_parallel parses TASK_SIZE pieces on a process pool: plain files are
+  split into line-aligned byte ranges the workers read themselves, compressed
+  files are decompressed here and their text handed out. Only a few pieces
+  are in flight at once, so memory stays bounded however big the input is
+
+Usage:
+    python log_parser.py <log file>... [--parallel]
+
+prints how many lines of each level there were and how long it took
+"""
+
+import bz2, gzip, lzma, mmap, os, sys, time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from patterns import LOG_LINE
+
+BATCH_SIZE = 10_000
+CHUNK_SIZE = 16 * 2**20
+# pieces handed to the pool by parse_parallel, and how many of them per worker
+# may be queued or finished but not yet yielded
+TASK_SIZE = 4 * 2**20
+TASKS_PER_WORKER = 2
+
+COMPRESSORS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+def is_compressed(path: str) -> bool:
+    return os.path.splitext(path)[1] in COMPRESSORS
+
+# text of bytes [start, end) of a plain file, in pieces that end on a line end
+# start must be the beginning of a line
+def mapped_chunks(path: str, start: int = 0, end: int = None, chunk_size: int = CHUNK_SIZE):
+    if os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        end = len(mm) if end is None else end
+        while start < end:
+            cut = mm.find(b"\n", min(start + chunk_size, end) - 1, end)
+            cut = end if cut == -1 else cut + 1
+            yield mm[start:cut].decode("utf-8", "replace")
+            start = cut
+
+def compressed_chunks(path: str, chunk_size: int = CHUNK_SIZE):
+    opener = COMPRESSORS[os.path.splitext(path)[1]]
+    with opener(path, "rt", encoding="utf-8", errors="replace", newline="") as f:
+        rest = ""
+        while data := f.read(chunk_size):
+            data = rest + data
+            cut = data.rfind("\n") + 1
+            yield data[:cut]
+            rest = data[cut:]
+        if rest:
+            yield rest
+
+def batches(chunks, batch_size: int = BATCH_SIZE):
+    for chunk in chunks:
+        records = LOG_LINE.findall(chunk)
+        for i in range(0, len(records), batch_size):
+            yield records[i:i + batch_size]
+
+# every record in path, batch_size at a time
+def iter_batches(path: str, batch_size: int = BATCH_SIZE):
+    chunks = compressed_chunks(path) if is_compressed(path) else mapped_chunks(path)
+    return batches(chunks, batch_size)
+
+# byte ranges of about shard_size covering path, each starting at the beginning of a line
+def shard_offsets(path: str, shard_size: int = TASK_SIZE) -> list:
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        while bounds[-1] + shard_size < size:
+            f.seek(bounds[-1] + shard_size)
+            # finish the line the offset landed in
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+# what the pool runs: records from a byte range of a plain file, or from text
+def parse_range(path: str, start: int, end: int) -> list:
+    return [record for chunk in mapped_chunks(path, start, end) for record in LOG_LINE.findall(chunk)]
+
+def parse_text(text: str) -> list:
+    return LOG_LINE.findall(text)
+
+# every piece of work for the pool, in file order, as (function, arguments)
+# a compressed file can't be split without reading it from the start, so it is
+# decompressed here and only the parsing is handed out
+def parse_tasks(paths: list):
+    for path in paths:
+        if is_compressed(path):
+            for text in compressed_chunks(path, TASK_SIZE):
+                yield parse_text, (text,)
+        else:
+            for start, end in shard_offsets(path):
+                yield parse_range, (path, start, end)
+
+# the records of every file, parsed across a process pool and yielded in
+# batches, in file order
+# at most TASKS_PER_WORKER pieces per worker are submitted ahead of the one being
+# yielded, so a slow consumer holds back the workers rather than piling up results
+def parse_parallel(paths: list, workers: int = None, batch_size: int = BATCH_SIZE):
+    workers = workers or os.cpu_count()
+    in_flight = deque()
+
+    def next_batches():
+        records = in_flight.popleft().result()
+        for i in range(0, len(records), batch_size):
+            yield records[i:i + batch_size]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for function, arguments in parse_tasks(paths):
+            in_flight.append(pool.submit(function, *arguments))
+            if len(in_flight) >= workers * TASKS_PER_WORKER:
+                yield from next_batches()
+        while in_flight:
+            yield from next_batches()
+
+def main():
+    paths = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not paths:
+        print(__doc__)
+        return
+
+    start = time.perf_counter()
+    if "--parallel" in sys.argv:
+        records = parse_parallel(paths)
+    else:
+        records = (batch for path in paths for batch in iter_batches(path))
+
+    levels = Counter()
+    for batch in records:
+        levels.update(level for _, level, _ in batch)
+    elapsed = time.perf_counter() - start
+
+    for level, count in levels.most_common():
+        print(f"{level:10} {count:>12,}")
+    print(f"{sum(levels.values()):,} records in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+patterns.py
+
+The patterns worked out in "regex problems.py", compiled once so they can be
+imported and reused (eg for log scrubbing) without recompiling or re-typing them.
+
+    from patterns import EMAIL
+    EMAIL.findall(text)
+
+PATTERNS maps a name to every pattern, which is what benchmark.py times.
+Patterns benchmark.py has flagged as slowing down faster than the input grows
+say so in their comment.
+"""
+
+import re
+
+# Match specific words
+CAT = re.compile(r'\bcat\b')
+
+# Case-insensitive match
+DOG = re.compile(r'\bdog\b', re.IGNORECASE)
+
+# Digits only
+DIGITS = re.compile(r'\d+')
+
+# Word boundaries
+CAR = re.compile(r'\b[Cc]ar\b')
+
+# Find punctuation
+PUNCTUATION = re.compile(r"[.,'\"]")
+
+# Find emails
+# quadratic on long runs of word characters with no "@": every start position
+# scans to the end of the run before giving up
+EMAIL = re.compile(r"[\w\.-]+@[\w\.]+\.\w+")
+
+# Phone numbers
+PHONE = re.compile(r'(?:\+44|07)(?: *|-)\d\d\d(?: *|-)\d\d\d(?: *|-)\d\d\d\b')
+
+# Alternation
+ANIMAL = re.compile(r'\bcat\b|\bdog\b|\bmouse\b', re.IGNORECASE)
+
+# Capturing groups
+ISO_DATE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+
+# Extract hashtags
+HASHTAG = re.compile(r"\#[\w-]+")
+
+# Date extraction 2
+UK_DATE = re.compile(r"(?:[012]\d|3[01])/(?:[0]\d|[1][0-2])/[012]\d{3}")
+
+# Find capitalised words
+CAPITALISED = re.compile(r"\b[A-Z][a-z]*\b")
+
+# Extract repeated words
+REPEATED_WORD = re.compile(r"\b(\w+)\s+\1\b")
+
+# Extract all quoted text
+# an unclosed quote makes it scan to the end of the line, but only once per
+# quote, so it stays linear
+QUOTED = re.compile(r"[\"\'](.*?)[\"\']")
+
+# Extract conditional statements
+# quadratic on lines with many "if "s and no ", then": each one scans to the end of the line
+CONDITIONAL = re.compile(r"[Ii]f (.*?), then")
+
+# Lookahead/lookbehind
+PERCENT_NUMBER = re.compile(r"(?<=%)\d+")                             # positive lookbehind
+NOT_PLURAL = re.compile(r"(?![a-z']*s\s)\b[a-z']+\b", re.IGNORECASE)  # negative lookahead
+
+# HMTL tag extraction
+# quadratic on lines with many "<title>"s and no "</title>"
+TITLE = re.compile(r"<title>(:?.*)</title>")
+
+# Named groups
+NAME = re.compile(r"Name:\s(?P<first>\w+)\s(?P<last>\w+)")
+
+# Extract URLs
+URL = re.compile(r"\bhttp[s]*://\w+[\.\w+]+\b")
+
+# Validate passwords (8+ char and contains at least: one upper, one lower, one digit one special character)
+PASSWORD_ENTRY = re.compile(r"(?P<p_num>p\d+):\s(?P<p_pass>[^\s]+)")
+# meant for .match on a single password: searched through text, every position
+# runs the ".*" lookaheads to the end of the line, which is quadratic
+VALID_PASSWORD = re.compile(r"((?=\S{8,})(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[!@#$%^&*()_+\-=\[\]{};':\"\\|,.<>\/?])\S+)")
+
+# Log file parsing
+# quadratic on lines with many "["s and no "]"
+LOG_TIMESTAMP = re.compile(r"\[(.*?)\]\s")
+LOG_LEVEL = re.compile(r"(?<=\]\s)(\w*):")
+LOG_MESSAGE = re.compile(r"(?<=:\s)(\w*)\b")
+# all three at once, one pass per line; MULTILINE so it can also be run over
+# many lines of text at once, each match being one line
+LOG_LINE = re.compile(r"^\[(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (?P<level>\w+): (?P<message>[^\r\n]*)",
+                      re.MULTILINE)
+
+PATTERNS = {
+    "cat": CAT,
+    "dog": DOG,
+    "digits": DIGITS,
+    "car": CAR,
+    "punctuation": PUNCTUATION,
+    "email": EMAIL,
+    "phone": PHONE,
+    "animal": ANIMAL,
+    "iso_date": ISO_DATE,
+    "hashtag": HASHTAG,
+    "uk_date": UK_DATE,
+    "capitalised": CAPITALISED,
+    "repeated_word": REPEATED_WORD,
+    "quoted": QUOTED,
+    "conditional": CONDITIONAL,
+    "percent_number": PERCENT_NUMBER,
+    "not_plural": NOT_PLURAL,
+    "title": TITLE,
+    "name": NAME,
+    "url": URL,
+    "password_entry": PASSWORD_ENTRY,
+    "valid_password": VALID_PASSWORD,
+    "log_timestamp": LOG_TIMESTAMP,
+    "log_level": LOG_LEVEL,
+    "log_message": LOG_MESSAGE,
+    "log_line": LOG_LINE,
+}
@@ -1,103 +1,101 @@
-import re
+from patterns import (CAT, DOG, DIGITS, CAR, PUNCTUATION, EMAIL, PHONE, ANIMAL, ISO_DATE, HASHTAG,
+                      UK_DATE, CAPITALISED, REPEATED_WORD, QUOTED, CONDITIONAL, PERCENT_NUMBER,
+                      NOT_PLURAL, TITLE, NAME, URL, PASSWORD_ENTRY, VALID_PASSWORD, LOG_TIMESTAMP,
+                      LOG_LEVEL, LOG_MESSAGE, LOG_LINE)
 
 # Match specific words
 s = "The cat sat on the cathedral."
-print(re.findall(r'\bcat\b', s))
+print(CAT.findall(s))
 
 # Case-insensitive match
 s = "Hot dog hot Dog hot diggedy dOG - snoop dogg"
-print(re.findall(r'\bdog\b', s, re.IGNORECASE))
+print(DOG.findall(s))
 
 # Digits only
 s = "Room 12 costs 30 quid"
-print(re.findall(r'\d+', s))
+print(DIGITS.findall(s))
 
 # Word boundaries
 s = "The carpet in the car needs a clean."
-print(re.findall(r'\b[Cc]ar\b', s))
+print(CAR.findall(s))
 
 # Find punctuation 
 s = 'In a statement, NUJ general secretary Laura Davison says the next director general must be "politically independent" and able to face pressures, including "AI-supercharged fake news".'
 import string
-print(re.findall(r"[.,'\"]", s))
+print(PUNCTUATION.findall(s))
 
 # Find emails
 s = 'Alice: alice@gmail.com, Bob: bob29@yahoo.co.uk, Charlie: chazzer_420@protonmail.org'
-print(re.findall(r"[\w\.-]+@[\w\.]+\.\w+", s))
+print(EMAIL.findall(s))
 
 # Phone numbers
 s = 'Alice: +44712123123, Bob: 07 456 456 465, Charlie: 07-789-789-789'
-print(re.findall(r'(?:\+44|07)(?: *|-)\d\d\d(?: *|-)\d\d\d(?: *|-)\d\d\d\b', s))
+print(PHONE.findall(s))
 
 # Alternation
 s = 'The Cat brown mouse dogged over the slow brown dog with a mouse in its cat'
-print(re.findall(r'\bcat\b|\bdog\b|\bmouse\b', s, re.IGNORECASE))
+print(ANIMAL.findall(s))
 
 # Capturing groups
 s = "My birthday is on 2025-11-10"
-print(re.findall(r'(\d{4})-(\d{2})-(\d{2})', s))
+print(ISO_DATE.findall(s))
 
 # Extract hashtags
 s = "I love #Python and #Machine-Learning, but #regex can be tricky."
-print(re.findall(r"\#[\w-]+", s))
+print(HASHTAG.findall(s))
 
 # Date extraction 2
 s = "John was born 28/10/2000 and Jane was born 01/01/1970"
-print(re.findall(r"(?:[012]\d|3[01])/(?:[0]\d|[1][0-2])/[012]\d{3}", s))
+print(UK_DATE.findall(s))
 
 # Find capitalised words
 s = "Alice and Bob went to NewYork in July."
-print(re.findall(r"\b[A-Z][a-z]*\b", s))
+print(CAPITALISED.findall(s))
 
 # Extract repeated words
 s = "I want to to go to the the park."
-print(re.findall(r"\b(\w+)\s+\1\b", s))
+print(REPEATED_WORD.findall(s))
 
 # Extract all quoted text
 s = 'He said "Hello" and then she replied \'Hi there\'.'
-print(re.findall(r"[\"\'](.*?)[\"\']", s))
+print(QUOTED.findall(s))
 
 # Extract conditional statements
 s = "If it rains, then we stay. If it snows, then we go."
-print(re.findall(r"[Ii]f (.*?), then", s))
+print(CONDITIONAL.findall(s))
 
 # Lookahead/lookbehind
 s = "Don't include 1 but do include numbers %2 %34 and %5. Don't include plurals or any other words ending in s."
-print(re.findall(r"(?<=%)\d+", s))                                  # positive lookbehind
-print(re.findall(r"(?![a-z']*s\s)\b[a-z']+\b", s, re.IGNORECASE))   # negative lookahead
+print(PERCENT_NUMBER.findall(s))    # positive lookbehind
+print(NOT_PLURAL.findall(s))        # negative lookahead
 #print(re.findall(r"\b[a-z']+[^s\W]\b", s, re.IGNORECASE))
 
 # HMTL tag extraction
 s = "<title>example text</title>"
-print(re.findall(r"<title>(:?.*)</title>", s))
+print(TITLE.findall(s))
 
 # Named groups
 s = "Name: John Doe, Age: 30"
-pattern = r"Name:\s(?P<first>\w+)\s(?P<last>\w+)"
-
-match = re.search(pattern, s)
+match = NAME.search(s)
 if match:
     result = match.groupdict()
     print(result)
 
 # Extract URLs
 s = "Visit https://example.com or http://test.co.uk for info."
-print(re.findall(r"\bhttp[s]*://\w+[\.\w+]+\b", s))
+print(URL.findall(s))
 
 # Validate passwords (8+ char and contains at least: one upper, one lower, one digit one special character):
 s = "p1: Abcdef1! p2: MyP@ssword123 p3: Z9x$wQ7r p4: Happy#2025 p5: abcdefg1 p6: ABCDEFG1! p7: Abcdefgh! p8: Abcdef12 p9: A1!b p10: Aa1_aaaa"
 
-pattern = r"(?P<p_num>p\d+):\s(?P<p_pass>[^\s]+)"
-
 passwords = {}
-for match in re.finditer(pattern, s):
+for match in PASSWORD_ENTRY.finditer(s):
     passwords[match.group("p_num")] = match.group("p_pass")
 print("All passwords:  ", passwords)
 
-valid_pass_pattern = r"((?=\S{8,})(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[!@#$%^&*()_+\-=\[\]{};':\"\\|,.<>\/?])\S+)"
 valid_passwords = {}
 for p in passwords:
-    valid = re.match(valid_pass_pattern, passwords[p])
+    valid = VALID_PASSWORD.match(passwords[p])
     if valid:
         valid_passwords[p] = passwords[p]
 print("Valid passwords:", valid_passwords)
@@ -105,6 +103,12 @@ print("Valid passwords:", valid_passwords)
 # Log file parsing
 s = "[2025-11-10 14:32:21] ERROR: Connection failed"
 
-print(f"{"Timestamp:":10}", re.findall(r"\[(.*?)\]\s", s))
-print(f"{"Type:":10}", re.findall(r"(?<=\]\s)(\w*):", s))
-print(f"{"Message:":10}", re.findall(r"(?<=:\s)(\w*)\b", s))
\ No newline at end of file
+print(f"{"Timestamp:":10}", LOG_TIMESTAMP.findall(s))
+print(f"{"Type:":10}", LOG_LEVEL.findall(s))
+print(f"{"Message:":10}", LOG_MESSAGE.findall(s))
+
+# Log file parsing, all fields in one pass (see log_parser.py for whole files)
+timestamp, level, message = LOG_LINE.match(s).groups()
+print(f"{"Timestamp:":10}", timestamp)
+print(f"{"Type:":10}", level)
+print(f"{"Message:":10}", message)
\ No newline at end of file
@@ -20,67 +20,251 @@ Notes:
 - Randomness affects both group composition and assignments
 - Grouping is used to avoid derangement edge cases and simplify logic
 - Output is deterministic once randomness is fixed (e.g. via seeding)
+- Banned pairings skip the groups and are solved as a bipartite matching,
+  see constrained_draw
 """
 
-import random
+import json, random, sqlite3, sys
+import numpy as np
 
 ##################
 # core functions #
 ##################
 
+# number of heads before the first tails when flipping a fair coin
+def coin_run() -> int:
+    run = 0
+    while True:
+        bits = random.getrandbits(64)
+        # trailing one bits are heads
+        heads = (~bits & (bits + 1)).bit_length() - 1
+        run += heads
+        if heads < 64:
+            return run
+
+# where each group starts in a shuffled list of n, plus n at the end
+# a group takes items until it has more than min_group_size, then each following
+# item has a 50% chance of joining it; rather than flipping a coin per item, the
+# length of each run of joins is drawn at once, so this is O(number of groups)
+# items too close to the end to form a group of min_group_size always join
+def group_bounds(n: int, min_group_size: int=2) -> list:
+    bounds = [0] if n else []
+    start = 0
+    while start < n:
+        split = start + min_group_size + 1 + coin_run()
+        start = split if split <= n - min_group_size else n
+        bounds.append(start)
+    return bounds
+
 # randomises list and from that builds groups sequentially
 # amount and size of groups random, but must exceed minimum threshold (2 by default)
 # returns a list of groups
 def define_groups(my_list: list, min_group_size: int=2) -> list:
     random.shuffle(my_list)
-    groups = []
-    groups_index = 0
-    item_count = 0
-    groups.append([my_list[0]])
-    
-    for item in my_list:
-        if item != my_list[0]:
-            item_count += 1
-            
-            # make sure group size exceeds threshold size
-            if len(groups[groups_index]) <= min_group_size or len(my_list) - item_count <= min_group_size - 1:
-                groups[groups_index].append(item)
-
-            # if allowed, each successive item has 50% change of joining group
-            else:
-                if random.randrange(2) == 0:
-                    groups[groups_index].append(item)
-                else:
-                    groups_index += 1
-                    groups.append([item])
-    
-    return groups
+    bounds = group_bounds(len(my_list), min_group_size)
+    return [my_list[start:end] for start, end in zip(bounds, bounds[1:])]
+
+# the receivers for a shuffled list split at bounds: each group is rotated by a
+# random offset, so order[i] gifts to the returned list's [i]
+# works on slices of the whole list, so no per-group lists or dicts are made
+def rotate_groups(order: list, bounds: list) -> list:
+    receivers = [None] * len(order)
+    for start, end in zip(bounds, bounds[1:]):
+        split = start + random.randrange(1, end - start)
+        receivers[start:end] = order[split:end] + order[start:split]
+    return receivers
 
 # creates a derangement of a list by offsetting by a randomised value
 # pairs values from original list to offset one
 def derange_group(my_list: list) -> dict:
-    derangement_factor = random.randrange(1, len(my_list))
-    participants_deranged = []
-    for i in range(len(my_list)):
-        j = (i + derangement_factor) % len(my_list)
-        participants_deranged.append(my_list[j])
-
-    return dict(zip(my_list, participants_deranged))
-
+    return dict(zip(my_list, rotate_groups(my_list, [0, len(my_list)])))
+
+# one grouped draw on participant numbers 0..n-1, done on NumPy arrays
+# returns receiver_of, where participant i gifts to receiver_of[i], and the groups
+# as the shuffled order plus where each group starts in it
+# the NumPy generator is seeded from random, so seeding random fixes the draw
+def draw_indices(n: int, min_group_size: int=3) -> tuple:
+    if n < 2:
+        raise ValueError("A draw needs at least 2 participants")
+    rng = np.random.default_rng(random.getrandbits(64))
+    group_starts, order, receivers = batch_receivers(rng, 1, n, min_group_size)
+    receiver_of = np.empty(n, dtype=np.int64)
+    receiver_of[order[0]] = receivers[0]
+    return receiver_of, order[0], np.flatnonzero(group_starts[0])
+
+def print_groups(participants: list, order: np.ndarray, starts: np.ndarray) -> None:
+    for group in np.split(order, starts[1:]):
+        print([participants[i] for i in group.tolist()])
+
+# pairs every participant with a receiver they're allowed to gift to, where
+# disallowed maps a gifter to the people they mustn't draw (eg their partner)
+# starts from the usual grouped draw, drops the banned pairs and
+# re-pairs those gifters one at a time by searching for an augmenting path, as
+# in Hopcroft-Karp, through the graph of allowed pairs. That graph is nearly
+# complete, so it is never built: a search only keeps track of receivers it
+# hasn't reached yet and skips the banned ones, costing O(n + exclusions)
+# if a gifter can't be re-paired no valid draw exists, so it raises ValueError
+# rather than retrying
+def constrained_draw(participants: list, disallowed: dict, min_group_size: int=3,
+                     show_groups: bool=False) -> dict:
+    n = len(participants)
+    index = {participant: i for i, participant in enumerate(participants)}
+    # kept as names: set() over each list runs in C, where mapping every banned
+    # name to its number took seconds for millions of bans
+    banned = {index[gifter]: set(receivers) for gifter, receivers in disallowed.items() if gifter in index}
+
+    def allowed(gifter: int, receiver: int) -> bool:
+        return gifter != receiver and participants[receiver] not in banned.get(gifter, ())
+
+    if n == 0:
+        return {}
+
+    grouped, order, starts = draw_indices(n, min_group_size)
+    if show_groups:
+        print_groups(participants, order, starts)
+
+    receiver_of = [-1] * n
+    gifter_of = [-1] * n
+    order = order.tolist()
+    for gifter, receiver in enumerate(grouped.tolist()):
+        if allowed(gifter, receiver):
+            receiver_of[gifter] = receiver
+            gifter_of[receiver] = gifter
+
+    free = [receiver for receiver in range(n) if gifter_of[receiver] == -1]
+    for start in order:
+        if receiver_of[start] != -1:
+            continue
+
+        # usually one of the free receivers will do: they are tried in random
+        # order (a Fisher-Yates shuffle done only as far as needed), so the
+        # pick is uniform among the allowed ones
+        path_end = None
+        for i in range(len(free)):
+            j = random.randrange(i, len(free))
+            free[i], free[j] = free[j], free[i]
+            if allowed(start, free[i]):
+                path_end = free[i]
+                free[i] = free[-1]
+                free.pop()
+                break
+        reached_from = {path_end: start} if path_end is not None else {}
+
+        # otherwise search: take a receiver from someone who can move to another
+        queue = [start]
+        if path_end is None:
+            unreached = set(range(n))
+            for gifter in queue:
+                skipped = set()
+                for receiver in unreached:
+                    if not allowed(gifter, receiver):
+                        skipped.add(receiver)
+                        continue
+                    reached_from[receiver] = gifter
+                    if gifter_of[receiver] == -1:
+                        path_end = receiver
+                        break
+                    queue.append(gifter_of[receiver])
+                if path_end is not None:
+                    free.remove(path_end)
+                    break
+                unreached = skipped
+
+        if path_end is None:
+            names = ", ".join(participants[g] for g in queue[:5]) + (", ..." if len(queue) > 5 else "")
+            raise ValueError(f"No valid draw: {len(queue)} participants ({names}) "
+                             f"can only gift to {len(queue) - 1} people between them")
+
+        # flip the path so every gifter on it moves to the receiver that reached them
+        receiver = path_end
+        while True:
+            gifter = reached_from[receiver]
+            previous = receiver_of[gifter]
+            receiver_of[gifter] = receiver
+            gifter_of[receiver] = gifter
+            if gifter == start:
+                break
+            receiver = previous
+
+    return dict(zip(participants, [participants[r] for r in receiver_of]))
+
+
+###############
+# batch draws #
+###############
+
+# marks where groups start for many draws of n at once, one row per draw
+# same rule as group_bounds: after the first min_group_size + 1 items a group
+# keeps taking items for a geometric number of coin flips, so the gaps between
+# group starts are drawn all at once and starts too near the end are dropped
+def batch_group_starts(rng, draws: int, n: int, min_group_size: int=2) -> np.ndarray:
+    max_groups = n // (min_group_size + 1) + 1
+    gaps = min_group_size + rng.geometric(0.5, size=(draws, max_groups))
+    starts = np.cumsum(gaps, axis=1)
+    rows, columns = np.nonzero(starts <= n - min_group_size)
+
+    group_starts = np.zeros((draws, n), dtype=bool)
+    group_starts[:, 0] = True
+    group_starts[rows, starts[rows, columns]] = True
+    return group_starts
+
+# the grouped draw for many draws of n at once, one row per draw: returns where
+# groups start, the shuffled order and the receivers, so order[d, i] gifts to
+# receivers[d, i]; each group is rotated by an offset from 1 to its size - 1
+def batch_receivers(rng, draws: int, n: int, min_group_size: int=2) -> tuple:
+    positions = np.arange(n)
+    group_starts = batch_group_starts(rng, draws, n, min_group_size)
+    if draws == 1:
+        order = rng.permutation(n)[np.newaxis]
+    else:
+        order = rng.permuted(np.tile(positions, (draws, 1)), axis=1)
+
+    # first position of each position's group, and the position after its last
+    start = np.maximum.accumulate(np.where(group_starts, positions, 0), axis=1)
+    next_start = np.full((draws, n), n)
+    next_start[:, :-1] = np.where(group_starts[:, 1:], positions[1:], n)
+    end = np.minimum.accumulate(next_start[:, ::-1], axis=1)[:, ::-1]
+    size = end - start
+
+    offset = 1 + (rng.random((draws, n)) * (size - 1)).astype(np.int64)
+    offset = np.take_along_axis(offset, start, axis=1)
+    receivers = np.take_along_axis(order, start + (positions - start + offset) % size, axis=1)
+    return group_starts, order, receivers
+
+# the same grouped draw as pull_from_hat, many at a time on participant numbers
+# 0..n-1; returns how many draws split into each number of groups, and an n x n
+# matrix of how often gifter i drew receiver j
+def batch_draws(n: int, iterations: int, min_group_size: int=2, seed: int=None,
+                batch_size: int=None) -> tuple:
+    rng = np.random.default_rng(seed)
+    # enough rows to keep each batch around 2M cells
+    batch_size = batch_size or max(1, 2_000_000 // n)
+    group_counts = np.zeros(n + 1, dtype=np.int64)
+    pair_counts = np.zeros(n * n, dtype=np.int64)
+
+    done = 0
+    while done < iterations:
+        draws = min(batch_size, iterations - done)
+        group_starts, order, receivers = batch_receivers(rng, draws, n, min_group_size)
+        group_counts += np.bincount(group_starts.sum(axis=1), minlength=n + 1)
+        pair_counts += np.bincount((order * n + receivers).ravel(), minlength=n * n)
+        done += draws
+
+    return group_counts, pair_counts.reshape(n, n)
 
 #####################
 # Testing functions #
 #####################
 
 # used for modelling distribution of group sizes for given number of participants
-def group_size_frequencies(list, iterations) -> dict:
-    number_of_groups_count = {}
-    [number_of_groups_count.setdefault(n, 0) for n in range(len(list) // 2 + 1)]
-
-    for i in range(iterations):
-        number_of_groups_count[len(define_groups(list))] += 1
+def group_size_frequencies(list, iterations, min_group_size: int=2) -> dict:
+    group_counts, _ = batch_draws(len(list), iterations, min_group_size)
+    return {n: int(group_counts[n]) for n in range(len(list) // 2 + 1)}
 
-    return number_of_groups_count
+# how often each participant drew each other one, as {gifter: {receiver: count}}
+def pair_frequencies(my_list, iterations, min_group_size: int=3) -> dict:
+    _, pair_counts = batch_draws(len(my_list), iterations, min_group_size)
+    return {gifter: dict(zip(my_list, row.tolist())) for gifter, row in zip(my_list, pair_counts)}
 
 # displays the distribution modelled above
 def print_distribution(my_list, iterations) -> None:
@@ -89,43 +273,154 @@ def print_distribution(my_list, iterations) -> None:
     for n in distribution:
         print(f"Group size {n:2}: {"x"*int(round((int(distribution[n])/100)))}")
 
-# checks the draw was valid by validating that every gifter is paired with a receiver
-# and that no one is gifting for themself
-def check_valid_draw(draw: dict) -> bool:
-    gifters = list(draw.keys())
-    receivers = list(draw.values())
+# checks the draw was valid: every gifter gives to someone different, everyone
+# receives exactly once, and no one draws a person they're disallowed from
+# one pass over the draw with set lookups, so it is O(n)
+def check_valid_draw(draw: dict, disallowed: dict=None) -> bool:
+    receivers = set(draw.values())
 
-    if not len(set(gifters)) == len(set(receivers)):
+    # as many different receivers as gifters, and the same people
+    if len(receivers) != len(draw) or receivers != draw.keys():
         return False
     
-    if not all(participant in receivers for participant in gifters):
+    if any(gifter == receiver for gifter, receiver in draw.items()):
+        return False
+
+    if disallowed and any(gifter in draw and draw[gifter] in banned for gifter, banned in disallowed.items()):
         return False
 
     return True
 
+# writes draws one per line, as JSON objects of gifter to receiver
+def save_draws(path: str, draws) -> None:
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as f:
+        for draw in draws:
+            f.write(json.dumps(draw, ensure_ascii=False) + "\n")
+
+# checks every draw in a file written by save_draws, one line at a time so the
+# file can be any size, and counts how often each gifter drew each receiver
+# returns {"draws", "invalid" (line numbers, first 100 kept), "invalid_count", "pairs"}
+# a line that isn't a JSON object of gifter to receiver counts as an invalid draw,
+# so one damaged line doesn't stop the rest of the file being checked
+def audit_draws(path: str, disallowed: dict=None) -> dict:
+    disallowed = {gifter: set(banned) for gifter, banned in (disallowed or {}).items()}
+    pairs = {}
+    invalid = []
+    invalid_count = 0
+    draws = 0
+    with open(path, encoding="utf-8", errors="replace", buffering=1 << 20) as f:
+        for line_number, line in enumerate(f, 1):
+            draws += 1
+            try:
+                draw = json.loads(line)
+                valid = isinstance(draw, dict) and check_valid_draw(draw, disallowed)
+            except (ValueError, TypeError):
+                valid = False
+            if not valid:
+                invalid_count += 1
+                if len(invalid) < 100:
+                    invalid.append(line_number)
+                continue
+            for pair in draw.items():
+                pairs[pair] = pairs.get(pair, 0) + 1
+
+    return {"draws": draws, "invalid": invalid, "invalid_count": invalid_count, "pairs": pairs}
+
+# displays the audit above, with the pairs drawn most and least often
+def print_audit(path: str, disallowed: dict=None) -> None:
+    audit = audit_draws(path, disallowed)
+    print(f"{audit['draws']} draws, {audit['invalid_count']} invalid")
+    if audit["invalid"]:
+        print("Invalid draws on lines:", ", ".join(map(str, audit["invalid"])))
+    if audit["pairs"]:
+        ranked = sorted(audit["pairs"].items(), key=lambda pair: pair[1])
+        valid = audit["draws"] - audit["invalid_count"]
+        for (gifter, receiver), count in ranked[-3:][::-1] + ranked[:3]:
+            print(f"{gifter:8} -> {receiver:8} {count:8} ({count / valid:.2%} of draws)")
+
 ################
-# main program #
+# draw history #
 ################
-def pull_from_hat(participants: list, min_group_size: int=3) -> dict:
-    groups = define_groups(participants, min_group_size)
-    draw = {}
 
-    def merge_two_dicts(x, y):
-        z = x.copy()
-        z.update(y)
-        return z
+# keeps every year's draw in an SQLite file
+# rows are keyed by (year, gifter) and also indexed by (gifter, year), so a
+# year's draw, a span of years, or one person's history are all index lookups
+class DrawStore:
+    def __init__(self, path: str="draws.sqlite"):
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS draws ("
+                        "year INTEGER, gifter TEXT, receiver TEXT, PRIMARY KEY (year, gifter))")
+        self.db.execute("CREATE INDEX IF NOT EXISTS draws_by_gifter ON draws (gifter, year)")
+
+    def close(self) -> None:
+        self.db.close()
+
+    # replaces anything already saved for that year
+    def save(self, year: int, draw: dict) -> None:
+        with self.db:
+            self.db.execute("DELETE FROM draws WHERE year = ?", (year,))
+            self.db.executemany("INSERT INTO draws VALUES (?, ?, ?)",
+                                ((year, gifter, receiver) for gifter, receiver in draw.items()))
+
+    def years(self) -> list:
+        return [year for (year,) in self.db.execute("SELECT DISTINCT year FROM draws ORDER BY year")]
+
+    def draw(self, year: int) -> dict:
+        rows = self.db.execute("SELECT gifter, receiver FROM draws WHERE year = ? ORDER BY gifter", (year,))
+        return dict(rows)
+
+    # who gifter had in the years_back years before year, newest first, as (year, receiver)
+    def history(self, gifter: str, year: int, years_back: int) -> list:
+        rows = self.db.execute("SELECT year, receiver FROM draws WHERE gifter = ? AND year >= ? AND year < ? "
+                               "ORDER BY year DESC", (gifter, year - years_back, year))
+        return rows.fetchall()
+
+    # every gifter -> receivers pairing from the years_back years before year
+    def recent_pairs(self, year: int, years_back: int) -> dict:
+        pairs = {}
+        rows = self.db.execute("SELECT gifter, receiver FROM draws WHERE year >= ? AND year < ?",
+                               (year - years_back, year))
+        for gifter, receiver in rows:
+            pairs.setdefault(gifter, set()).add(receiver)
+        return pairs
+
+# the draw for a year, made once and then kept in the store, so running it again
+# (eg after a crash, or to print it) gives back the same draw
+# nobody draws someone they had in the last years_back years, on top of disallowed
+def draw_year(store: DrawStore, year: int, participants: list, disallowed: dict=None,
+              years_back: int=2, min_group_size: int=3) -> dict:
+    if draw := store.draw(year):
+        return draw
+
+    exclusions = store.recent_pairs(year, years_back)
+    for gifter, banned in (disallowed or {}).items():
+        exclusions.setdefault(gifter, set()).update(banned)
+
+    draw = pull_from_hat(participants, min_group_size, disallowed=exclusions)
+    store.save(year, draw)
+    return draw
 
-    for group in groups:
-        print(group)
-        group_paired = derange_group(group)
-        
-        draw = merge_two_dicts(draw, group_paired)
-
-    return dict(sorted(draw.items()))
+################
+# main program #
+################
+# returns the draw in the same order as participants
+# with disallowed pairs the grouped draw is only a starting point, see constrained_draw
+def pull_from_hat(participants: list, min_group_size: int=3, disallowed: dict=None,
+                  show_groups: bool=False) -> dict:
+    if disallowed:
+        return constrained_draw(participants, disallowed, min_group_size, show_groups)
+    if not participants:
+        return {}
+
+    # drawn on numbers and only turned back into names at the end
+    receiver_of, order, starts = draw_indices(len(participants), min_group_size)
+    if show_groups:
+        print_groups(participants, order, starts)
+    return dict(zip(participants, map(participants.__getitem__, receiver_of.tolist())))
 
 ################
 
-def main():
+def main(year: int=None):
     participants = ["Alice", "Bob", "Charlie", "David", "Emma", "Frank", "Gabriel", "Hannah", "Imogen", "Jamie", "Kate",
                     "Liam", "Max", "Nick", "Olivia", "Peter", "Quentin", "Racheal", "Simon", "Tina", "Uma", "Velma", "Wilson",
                     "Xanvier", "Yorik", "Zack"]
@@ -139,18 +434,27 @@ def main():
     participants = participants[:group_size]
 
 
-    draws = pull_from_hat(participants)
+    if year:
+        store = DrawStore()
+        draws = draw_year(store, year, participants, disallowed)
+        store.close()
+    else:
+        draws = pull_from_hat(participants, disallowed=disallowed, show_groups=True)
     for participant in draws:
         print(f"{participant:8} is gifting {draws[participant]}")
 
-    valid = True
-    for i in range(10):
-        if not check_valid_draw(draws):
-            valid = False
-
-    if valid:
+    if check_valid_draw(draws, disallowed):
         print("Grouping is valid")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # python secret_santa.py                  make a draw
+    # python secret_santa.py --audit <file>   check a file of draws saved by save_draws
+    # python secret_santa.py --year <year>    make (or reuse) that year's draw in
+    #                                         draws.sqlite, avoiding the last 2 years' pairs
+    if "--audit" in sys.argv:
+        print_audit(sys.argv[sys.argv.index("--audit") + 1])
+    elif "--year" in sys.argv:
+        main(int(sys.argv[sys.argv.index("--year") + 1]))
+    else:
+        main()
\ No newline at end of file